@@ -0,0 +1,899 @@
+"""Benchmarks for Quiz Master Pro.
+
+Each benchmark builds its own synthetic data in a temporary directory, so
+the real quiz_master.db and CSV files are never touched.
+
+    python benchmark.py login --sizes 1000 100000 1000000
+    python benchmark.py render --questions 500     (needs a display)
+    python benchmark.py loadtest --students 2000 --workers 32
+    python benchmark.py submit --submitters 1000
+    python benchmark.py timer --hours 3
+    python benchmark.py memory --questions 1000000
+    python benchmark.py dedup --questions 1000000
+    python benchmark.py pack --questions 1000000
+    python benchmark.py roster --students 400000 --changes 3000
+
+The suite is the regression gate: it times the main code paths on
+generated data, prints the results as JSON and, given a baseline from an
+earlier run, exits non-zero if any of them got slower. Screen rendering
+is timed under Xvfb when no display is set.
+
+    python benchmark.py suite --save-baseline baseline.json
+    python benchmark.py suite --baseline baseline.json --tolerance 0.3
+"""
+import argparse
+import csv
+import heapq
+import json
+import os
+import platform
+import random
+import secrets
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import tp
+
+
+def timeit(func, repeat):
+    """Return the mean wall time of func() in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def write_roster_csv(path, count):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        for i in range(count):
+            writer.writerow([f"student{i}", f"pass{i}"])
+
+
+def build_user_db(db_path, count, filler_iterations=1, batch_size=50000):
+    """Fill the users table with count students.
+
+    Filler accounts use filler_iterations PBKDF2 rounds so setup stays fast,
+    but the last one (the account the login benchmarks sign in as) is hashed
+    at the production PASSWORD_ITERATIONS, so login timings pay the real KDF.
+    """
+    store = tp.UserStore(db_path, iterations=tp.PASSWORD_ITERATIONS)
+    salt = secrets.token_hex(16)
+    with store.conn:
+        for start in range(0, count, batch_size):
+            batch = [(f"student{i}", tp.UserStore.hash_password(f"pass{i}", salt, filler_iterations), salt)
+                     for i in range(start, min(start + batch_size, count))]
+            store.conn.executemany(
+                "INSERT INTO users (username, password_hash, salt) VALUES (?, ?, ?)", batch)
+    if count:
+        user_id = store.lookup(f"student{count - 1}")[0]
+        store.set_password_hash(user_id, tp.UserStore.hash_password(f"pass{count - 1}", salt), salt)
+    return store
+
+
+def csv_login(path, username, password):
+    """The pre-database login: scan student_info.csv line by line"""
+    with open(path, "r", newline="") as file:
+        for row in csv.reader(file):
+            if len(row) >= 2 and row[0] == username and row[1] == password:
+                return True
+    return False
+
+
+def bench_login(sizes):
+    print(f"{'users':>10} {'csv scan ms':>12} {'db lookup ms':>13} {'lookup speedup':>15} {'db login ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in sizes:
+            csv_path = os.path.join(tmp, f"roster_{count}.csv")
+            db_path = os.path.join(tmp, f"users_{count}.db")
+            write_roster_csv(csv_path, count)
+            store = build_user_db(db_path, count)
+
+            # Worst case for the scan: the last student in the file
+            username, password = f"student{count - 1}", f"pass{count - 1}"
+            assert csv_login(csv_path, username, password)
+            assert store.authenticate(username, password)
+
+            scan_ms = timeit(lambda: csv_login(csv_path, username, password), max(3, 100000 // count))
+            lookup_ms = timeit(lambda: store.lookup(username), 2000)
+            login_ms = timeit(lambda: store.authenticate(username, password), 10)
+            print(f"{count:>10} {scan_ms:>12.3f} {lookup_ms:>13.4f} {scan_ms / lookup_ms:>14.0f}x {login_ms:>12.1f}")
+            store.conn.close()
+
+    print("csv scan compares plain-text passwords; db login is the index lookup plus "
+          f"PBKDF2 at the production {tp.PASSWORD_ITERATIONS} iterations")
+    salt = secrets.token_hex(16)
+    kdf_ms = timeit(lambda: tp.UserStore.hash_password("password", salt), 20)
+    print(f"PBKDF2 cost at {tp.PASSWORD_ITERATIONS} iterations: {kdf_ms:.1f} ms per login (size independent)")
+
+
+def write_question_csv(path, count):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        for i in range(count):
+            writer.writerow([f"Question {i}: which option is correct?",
+                             f"Option A{i}", f"Option B{i}", f"Option C{i}", f"Option D{i}", "ABCD"[i % 4]])
+
+
+def settle(root, app):
+    """Pump the event loop until the app's background jobs have delivered their results"""
+    root.update()
+    while app.jobs.pending:
+        time.sleep(0.001)
+        root.update()
+
+
+def bench_render(count):
+    """Step through a quiz of count questions and report per-question render latency"""
+    import tkinter as tk
+
+    subject = next(iter(tp.SUBJECT_FILES))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            write_question_csv(tp.SUBJECT_FILES[subject], count)
+            root = tk.Tk()
+            app = tp.QuizApp(root)
+            app.selected_subject = tk.StringVar(value=subject)
+            app.start_quiz()
+            settle(root, app)
+            for _ in range(count - 1):
+                app.selected_option.set("A")
+                app.next_question()
+                root.update()
+
+            times = app.render_times
+            window = max(1, len(times) // 5)
+            print(f"{'questions':>12} {'mean ms':>9} {'p95 ms':>8}")
+            for start in range(0, len(times), window):
+                chunk = times[start:start + window]
+                print(f"{start + 1:>5}-{start + len(chunk):<6} {sum(chunk) / len(chunk):>9.3f} "
+                      f"{tp.percentile(chunk, 95):>8.3f}")
+            print(app.render_latency_stats())
+            root.destroy()
+        finally:
+            os.chdir(cwd)
+
+
+def report_latencies(name, samples):
+    print(f"{name:>14} n={len(samples):<7} p50={tp.percentile(samples, 50):8.3f}ms "
+          f"p95={tp.percentile(samples, 95):8.3f}ms p99={tp.percentile(samples, 99):8.3f}ms")
+
+
+def bench_loadtest(students, workers, questions):
+    """Run many headless QuizSessions concurrently against one database.
+
+    Every worker thread gets its own connections (SQLite connections are
+    per thread), as separate student processes would.
+    """
+    subject = next(iter(tp.SUBJECT_FILES))
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "quiz_master.db")
+        csv_path = os.path.join(tmp, "bank.csv")
+        write_question_csv(csv_path, questions)
+        tp.QuestionBank(db_path).import_csv(subject, csv_path)
+
+        local = threading.local()
+        latencies = {"start": [], "next_question": [], "submit": [], "session": []}
+        errors = []
+        lock = threading.Lock()
+
+        def student(number):
+            if not hasattr(local, "bank"):
+                local.bank = tp.QuestionBank(db_path)
+                local.results = tp.ResultStore(db_path)
+            rng = random.Random(number)
+            timings = {"next_question": []}
+            try:
+                session_started = time.perf_counter()
+                session = tp.QuizSession(local.bank, local.results, {"id": number})
+                started = time.perf_counter()
+                session.start(subject)
+                timings["start"] = [(time.perf_counter() - started) * 1000]
+                while not session.finished:
+                    session.current_question()
+                    started = time.perf_counter()
+                    session.next_question(rng.choice("ABCD"))
+                    timings["next_question"].append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                session.submit()
+                timings["submit"] = [(time.perf_counter() - started) * 1000]
+                timings["session"] = [(time.perf_counter() - session_started) * 1000]
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                return
+            with lock:
+                for name, values in timings.items():
+                    latencies[name].extend(values)
+
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(student, range(1, students + 1)))
+        wall = time.perf_counter() - wall_started
+
+        completed = len(latencies["session"])
+        print(f"{students} students, {workers} workers, {questions} questions each")
+        print(f"completed {completed} sessions in {wall:.2f}s: {completed / wall:,.0f} sessions/sec, "
+              f"{len(errors)} errors")
+        for name in ("start", "next_question", "submit", "session"):
+            report_latencies(name, latencies[name])
+        if errors:
+            print("first error:", errors[0])
+
+
+def bench_submit(submitters):
+    """Release submitters threads at once, each storing one quiz result.
+
+    Compares one transaction per submission (a ResultStore per thread)
+    with the group-committing ResultWriter.
+    """
+    subject = next(iter(tp.SUBJECT_FILES))
+
+    def run(db_path, make_recorder):
+        barrier = threading.Barrier(submitters)
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def submitter(number):
+            record = make_recorder()
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                record(number, subject, number % 10, 10)
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                return
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        threads = [threading.Thread(target=submitter, args=(n,)) for n in range(submitters)]
+        wall_started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - wall_started
+        return latencies, errors, wall
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct_db = os.path.join(tmp, "direct.db")
+        tp.ResultStore(direct_db).conn.close()
+
+        def direct_recorder():
+            store = tp.ResultStore(direct_db)
+            return store.record
+
+        latencies, errors, wall = run(direct_db, direct_recorder)
+        print(f"one transaction per submit: {len(latencies) / wall:,.0f} commits/sec, {len(errors)} errors")
+        report_latencies("submit", latencies)
+
+        group_db = os.path.join(tmp, "group.db")
+        writer = tp.ResultWriter(group_db)
+        latencies, errors, wall = run(group_db, lambda: lambda *row: writer.record(*row).result())
+        writer.close()
+        print(f"group commit: {len(latencies) / wall:,.0f} results/sec in {writer.commits} commits "
+              f"({writer.retries} busy retries), {len(errors)} errors")
+        report_latencies("submit", latencies)
+
+
+class VirtualRoot:
+    """Stand-in for tk.Tk's after()/after_cancel() on a simulated clock.
+
+    Every callback fires up to max_lag_ms late, like a busy Tk event loop.
+    """
+
+    def __init__(self, max_lag_ms, seed=1):
+        self.time = 0.0
+        self.queue = []
+        self.cancelled = set()
+        self.next_id = 0
+        self.rng = random.Random(seed)
+        self.max_lag = max_lag_ms / 1000
+
+    def now(self):
+        return self.time
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        due = self.time + ms / 1000 + self.rng.uniform(0, self.max_lag)
+        heapq.heappush(self.queue, (due, self.next_id, callback))
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        self.cancelled.add(after_id)
+
+    def run(self):
+        while self.queue:
+            self.time, after_id, callback = heapq.heappop(self.queue)
+            if after_id not in self.cancelled:
+                callback()
+
+
+def bench_timer(hours, max_lag_ms):
+    """Simulate one exam countdown under event-loop lag, old counter vs CountdownTicker"""
+    seconds = int(hours * 3600)
+
+    # The previous update_timer: decrement a counter every after(1000)
+    legacy_root = VirtualRoot(max_lag_ms)
+    legacy = {"left": seconds, "wakeups": 0, "expired_at": None}
+
+    def legacy_tick():
+        legacy["wakeups"] += 1
+        if legacy["left"] > 0:
+            legacy["left"] -= 1
+            legacy_root.after(1000, legacy_tick)
+        else:
+            legacy["expired_at"] = legacy_root.time
+
+    legacy_started = time.process_time()
+    legacy_tick()
+    legacy_root.run()
+    legacy_cpu = time.process_time() - legacy_started
+
+    root = VirtualRoot(max_lag_ms)
+    ticker = tp.CountdownTicker(root, now=root.now)
+    shown = []
+    expired = {}
+    ticker_started = time.process_time()
+    ticker.add(seconds, shown.append, lambda: expired.setdefault("at", root.time))
+    root.run()
+    ticker_cpu = time.process_time() - ticker_started
+
+    print(f"{hours:g}h exam, callbacks up to {max_lag_ms}ms late")
+    # CPU includes the simulated event loop for both, so only the difference is meaningful
+    print(f"{'':>16} {'wakeups':>8} {'expiry late by':>15} {'cpu total ms':>13} {'cpu us/wakeup':>14}")
+    print(f"{'counter':>16} {legacy['wakeups']:>8} {legacy['expired_at'] - seconds:>14.1f}s "
+          f"{legacy_cpu * 1000:>13.1f} {legacy_cpu * 1e6 / legacy['wakeups']:>14.2f}")
+    print(f"{'CountdownTicker':>16} {ticker.wakeups:>8} {expired['at'] - seconds:>14.3f}s "
+          f"{ticker_cpu * 1000:>13.1f} {ticker_cpu * 1e6 / ticker.wakeups:>14.2f}")
+    skipped = sum(1 for a, b in zip(shown, shown[1:]) if a - b > 1)
+    print(f"CountdownTicker displayed {len(shown)} values, {skipped} skipped seconds")
+
+
+def question_rows(count, distinct_options=5000, seed=1):
+    """Yield count fresh question rows, as csv.reader would produce them.
+
+    Options are drawn from distinct_options choices, like real banks where
+    "True", "False" and "None of the above" recur across many questions.
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        yield [f"Question {i}: which of these is correct?",
+               *(f"Option {rng.randrange(distinct_options)}" for _ in range(4)),
+               "ABCD"[i % 4]]
+
+
+def bench_memory(count):
+    """Memory held by count questions: list of lists vs CompactQuestions"""
+    def measure(build):
+        tracemalloc.start()
+        started = time.perf_counter()
+        store = build()
+        elapsed = time.perf_counter() - started
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return store, size, elapsed
+
+    rows, list_bytes, list_seconds = measure(lambda: list(question_rows(count)))
+    sample = [rows[i] for i in range(0, count, max(1, count // 1000))]
+    del rows
+    compact, compact_bytes, compact_seconds = measure(lambda: tp.CompactQuestions(question_rows(count)))
+    # Same content, whichever layout holds it
+    assert all(list(compact[i * max(1, count // 1000)]) == row for i, row in enumerate(sample))
+
+    print(f"{count} questions, {len(compact.pool)} distinct options")
+    print(f"{'layout':>18} {'MB':>9} {'bytes/question':>15} {'build s':>8}")
+    print(f"{'list of lists':>18} {list_bytes / 2**20:>9.1f} {list_bytes / count:>15.0f} {list_seconds:>8.2f}")
+    print(f"{'CompactQuestions':>18} {compact_bytes / 2**20:>9.1f} {compact_bytes / count:>15.0f} "
+          f"{compact_seconds:>8.2f}")
+    print(f"CompactQuestions uses {compact_bytes / list_bytes:.0%} of the list-of-lists memory")
+
+
+def write_duplicated_question_csv(path, count, duplicate_rate, seed=1):
+    """Write count questions of which about duplicate_rate are copies of earlier ones.
+
+    Half the copies differ only in case and punctuation, the other half
+    have one word changed. Returns the number of copies written.
+    """
+    rng = random.Random(seed)
+    words = [f"w{i}x" for i in range(20000)]
+    originals = []
+    copies = 0
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        for i in range(count):
+            if originals and rng.random() < duplicate_rate:
+                text = rng.choice(originals).split()
+                if copies % 2:
+                    text[rng.randrange(len(text))] = rng.choice(words)
+                    question = " ".join(text) + "?"
+                else:
+                    question = " ".join(text).upper() + "!"
+                copies += 1
+            else:
+                question = " ".join(rng.choice(words) for _ in range(rng.randint(12, 20))) + "?"
+                if len(originals) < 100000:
+                    originals.append(question.rstrip("?"))
+            writer.writerow([question, "a", "b", "c", "d", "ABCD"[i % 4]])
+    return copies
+
+
+def write_templated_question_csv(path, count):
+    """Write count questions generated from one template, so most share their LSH bands"""
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        for i in range(count):
+            writer.writerow([f"Question {i}: which option is correct?", "a", "b", "c", "d", "ABCD"[i % 4]])
+
+
+def bench_dedup(count, duplicate_rate):
+    """Import with duplicate checks, then a batch duplicate scan of the whole bank"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Templated banks put thousands of questions in the same bands
+        templated_path = os.path.join(tmp, "templated.csv")
+        write_templated_question_csv(templated_path, count)
+        bank = tp.QuestionBank(os.path.join(tmp, "templated.db"))
+        report = bank.import_csv("Templated", templated_path)
+        print(f"import of {count} templated rows: {report.elapsed:.1f}s, {report.rows_per_sec:,.0f} rows/sec")
+        print(f"  skipped {report.skipped} exact duplicates, flagged {report.near_duplicates} near-duplicates")
+        bank.conn.close()
+
+        csv_path = os.path.join(tmp, "questions.csv")
+        copies = write_duplicated_question_csv(csv_path, count, duplicate_rate)
+        bank = tp.QuestionBank(os.path.join(tmp, "bench.db"))
+
+        report = bank.import_csv("Bench", csv_path)
+        print(f"import of {count} rows ({copies} planted copies): {report.elapsed:.1f}s, "
+              f"{report.rows_per_sec:,.0f} rows/sec")
+        print(f"  skipped {report.skipped} exact duplicates, flagged {report.near_duplicates} near-duplicates")
+
+        # Batch mode sees the bank as it would be after a plain import of every row
+        with bank.conn:
+            bank.conn.execute("DELETE FROM quizzes")
+            bank.duplicates.clear("Bench")
+        with open(csv_path, newline="") as file:
+            rows = [("Bench", *row) for row in csv.reader(file)]
+        with bank.conn:
+            bank.conn.executemany(
+                "INSERT INTO quizzes (subject, question, option_a, option_b, option_c, option_d, correct_answer) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            bank._bump_version("Bench")
+            bank.conn.execute("DELETE FROM settings WHERE setting_name = 'dedup_index_version:Bench'")
+        del rows
+
+        started = time.perf_counter()
+        pairs = bank.find_duplicates("Bench")
+        found = time.perf_counter() - started
+        exact = sum(1 for _, _, similarity in pairs if similarity == 1.0)
+        print(f"batch scan of {count} questions: {found:.1f}s (index build included)")
+        print(f"  found {exact} exact and {len(pairs) - exact} near-duplicates")
+        started = time.perf_counter()
+        bank.remove_questions("Bench", [duplicate_id for duplicate_id, _, _ in pairs])
+        print(f"  removed them in {time.perf_counter() - started:.1f}s, {bank.count('Bench')} questions left")
+
+
+def bench_pack(count):
+    """Time and memory to open a subject and read a few questions: CSV, table pages, mapped pack"""
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "questions.csv")
+        write_question_csv(csv_path, count)
+        bank = tp.QuestionBank(os.path.join(tmp, "bench.db"))
+        with open(csv_path, newline="") as file, bank.conn:
+            bank.conn.executemany(
+                "INSERT INTO quizzes (subject, question, option_a, option_b, option_c, option_d, correct_answer) "
+                "VALUES ('Bench', ?, ?, ?, ?, ?, ?)", csv.reader(file))
+            bank._bump_version("Bench")
+
+        started = time.perf_counter()
+        bank.build_pack("Bench")
+        print(f"{count} questions, pack built in {time.perf_counter() - started:.1f}s, "
+              f"{os.path.getsize(bank.pack_path('Bench')) / 2**20:.1f} MB")
+        bank.packs.clear()
+
+        def csv_load():
+            with open(csv_path, newline="") as file:
+                return list(csv.reader(file))
+
+        def paged_load():
+            bank.cache = tp.QuestionCache(tp.QUESTION_CACHE_BYTES)
+            return tp.PagedQuestions(bank, "Bench")
+
+        def pack_load():
+            bank.packs.clear()
+            return bank.open_pack("Bench")
+
+        print(f"{'source':>14} {'open + 3 reads ms':>18} {'python MB held':>15}")
+        for name, load in (("csv parse", csv_load), ("table pages", paged_load), ("mapped pack", pack_load)):
+            tracemalloc.start()
+            started = time.perf_counter()
+            questions = load()
+            for index in (0, len(questions) // 2, len(questions) - 1):
+                questions[index]
+            elapsed = time.perf_counter() - started
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print(f"{name:>14} {elapsed * 1000:>18.2f} {held / 2**20:>15.2f}")
+            del questions
+
+
+def bench_roster(count, changes):
+    """A term roster sync where only a few rows change, against hashing every row again.
+
+    Passwords are hashed with one PBKDF2 round so the diff itself is what
+    gets timed; the production cost of the changed rows is added from a
+    measured per-hash time.
+    """
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, "roster_1.csv")
+        write_roster_csv(first, count)
+        store = tp.UserStore(os.path.join(tmp, "bench.db"), iterations=1)
+        started = time.perf_counter()
+        store.sync_roster(first)
+        print(f"{count} students loaded in {time.perf_counter() - started:.1f}s")
+
+        # A third of the changes are new passwords, a third new students, a third leavers
+        changed = set(rng.sample(range(count), changes // 3))
+        leavers = set(rng.sample(range(count), changes // 3))
+        second = os.path.join(tmp, "roster_2.csv")
+        with open(second, "w", newline="") as file:
+            writer = csv.writer(file)
+            for i in range(count):
+                if i not in leavers:
+                    writer.writerow([f"student{i}", f"new{i}" if i in changed else f"pass{i}"])
+            for i in range(changes // 3):
+                writer.writerow([f"newcomer{i}", f"pass{i}"])
+
+        report = store.sync_roster(second)
+        print(report.summary())
+
+    salt = secrets.token_hex(16)
+    kdf_ms = timeit(lambda: tp.UserStore.hash_password("password", salt), 10)
+    workers = tp.LOGIN_WORKERS
+    hashed = report.imported + report.updated
+    print(f"At {tp.PASSWORD_ITERATIONS} iterations on {workers} workers: sync "
+          f"~{report.elapsed + hashed * kdf_ms / 1000 / workers:.1f}s, rehashing every row "
+          f"~{count * kdf_ms / 1000 / workers:,.0f}s")
+
+
+@contextmanager
+def virtual_display():
+    """Yield True when Tk can open a window, starting Xvfb if no X display is set"""
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        yield True
+        return
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        yield False
+        return
+    number = 100 + os.getpid() % 400
+    process = subprocess.Popen([xvfb, f":{number}", "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(f"/tmp/.X11-unix/X{number}"):
+            if process.poll() is not None or time.monotonic() > deadline:
+                yield False
+                return
+            time.sleep(0.05)
+        os.environ["DISPLAY"] = f":{number}"
+        try:
+            yield True
+        finally:
+            del os.environ["DISPLAY"]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@contextmanager
+def silent_dialogs():
+    """Answer message boxes automatically so screens can be driven unattended"""
+    saved = {name: getattr(tp.messagebox, name) for name in ("showinfo", "showwarning", "showerror", "askyesno")}
+    for name in ("showinfo", "showwarning", "showerror"):
+        setattr(tp.messagebox, name, lambda *args, **kwargs: "ok")
+    tp.messagebox.askyesno = lambda *args, **kwargs: True
+    try:
+        yield
+    finally:
+        for name, func in saved.items():
+            setattr(tp.messagebox, name, func)
+
+
+def sample(func, repeat, setup=None):
+    """Run func repeat times, each after an untimed setup(); returns milliseconds per run"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def summarize(times):
+    return {"median_ms": round(statistics.median(times), 4),
+            "p95_ms": round(tp.percentile(times, 95), 4),
+            "runs": len(times)}
+
+
+def suite_headless(results, students, questions, repeat):
+    """Cases that need no display: storage, loading and scoring"""
+    subject = next(iter(tp.SUBJECT_FILES))
+
+    store = build_user_db(tp.DB_FILE, students)
+    store.add_user("bench", "bench-password")
+    last = f"student{students - 1}"
+    results["login"] = summarize(sample(lambda: store.authenticate(last, f"pass{students - 1}"), repeat))
+    results["login_lookup"] = summarize(sample(lambda: store.lookup(last), repeat * 100))
+    counter = iter(range(10 ** 9))
+    results["add_student"] = summarize(sample(lambda: store.add_user(f"added{next(counter)}", "pw"), repeat))
+
+    write_question_csv(tp.SUBJECT_FILES[subject], questions)
+    bank = tp.QuestionBank()
+    bank.import_csv(subject, tp.SUBJECT_FILES[subject])
+    session = tp.QuizSession(bank)
+
+    def load():
+        session.load_questions(subject)
+        session.questions[0]
+        session.questions[len(session.questions) - 1]
+
+    def cold_cache():
+        bank.cache = tp.QuestionCache(tp.QUESTION_CACHE_BYTES)
+        bank.packs.clear()
+
+    results["load_questions"] = summarize(sample(load, repeat * 10, cold_cache))
+    bank.build_pack(subject)
+    results["load_questions_pack"] = summarize(sample(load, repeat * 10, cold_cache))
+    # Later cases measure the table path, as with no pack built
+    bank.packs.clear()
+    os.remove(bank.pack_path(subject))
+
+    rng = random.Random(1)
+    scored = tp.QuizSession(bank, tp.ResultStore(), {"id": 1})
+    scored.start(subject)
+    scored.selected_answers = [rng.choice("ABCD") for _ in range(len(scored.questions))]
+
+    def reset_score():
+        scored.score_result = None
+
+    results["calculate_score"] = summarize(sample(scored.submit, repeat * 10, reset_score))
+    results["add_question"] = summarize(sample(
+        lambda: bank.add_question(subject, [f"Added question {next(counter)} about w{rng.randrange(10 ** 6)}x?",
+                                            "a", "b", "c", "d", "A"]), repeat * 10))
+
+
+def suite_screens(results, questions, repeat):
+    """Cases that drive QuizApp screens; needs a display"""
+    import tkinter as tk
+
+    subject = next(iter(tp.SUBJECT_FILES))
+    root = tk.Tk()
+    try:
+        with silent_dialogs():
+            app = tp.QuizApp(root)
+            root.update()
+
+            def login():
+                app.create_login_screen()
+                app.username_entry.insert(0, "bench")
+                app.password_entry.insert(0, "bench-password")
+                app.login()
+                # The password check finishes on the login pool; wait for the next screen
+                while app.session_token is None:
+                    root.update()
+                    time.sleep(0.001)
+
+            results["login_screen"] = summarize(sample(login, repeat))
+
+            app.create_admin_panel()
+            app.refresh_quiz_list()
+            settle(root, app)
+            counter = iter(range(10 ** 9))
+
+            def fill_question():
+                app.generate_question()
+                app.question_subject.set(subject)
+                values = [f"New question {next(counter)} about something?", "a", "b", "c", "d", "B"]
+                for entry, value in zip(app.entries.values(), values):
+                    entry.insert(0, value)
+
+            def save():
+                app.save_question()
+                settle(root, app)
+
+            results["save_question"] = summarize(sample(save, repeat, fill_question))
+
+            app.completed_quizzes = set()
+            app.selected_subject = tk.StringVar(value=subject)
+            app.start_quiz()
+            settle(root, app)
+            for _ in range(min(questions, 200) - 1):
+                app.selected_option.set("A")
+                app.next_question()
+                root.update()
+            results["display_question"] = summarize(app.render_times)
+            app.submit_quiz()
+            root.update()
+
+            def review():
+                app.review_answers()
+                root.update()
+
+            results["review_answers"] = summarize(sample(review, repeat))
+
+            try:
+                import matplotlib
+                matplotlib.use("TkAgg")
+            except ImportError:
+                return ["show_performance"]
+
+            def performance():
+                app.show_performance()
+                root.update()
+
+            results["show_performance"] = summarize(sample(performance, repeat))
+            import matplotlib.pyplot as plt
+            plt.close("all")
+    finally:
+        root.destroy()
+    return []
+
+
+def run_suite(students, questions, repeat):
+    results = {}
+    skipped = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            suite_headless(results, students, questions, repeat)
+            with virtual_display() as has_display:
+                if has_display:
+                    skipped += suite_screens(results, questions, repeat)
+                else:
+                    skipped += ["login_screen", "save_question", "display_question", "review_answers",
+                                "show_performance"]
+        finally:
+            os.chdir(cwd)
+    return {
+        "meta": {"students": students, "questions": questions, "repeat": repeat,
+                 "python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance, min_delta_ms):
+    """Print each case against the baseline; returns the names that regressed"""
+    sizes = ("students", "questions")
+    if any(report["meta"][key] != baseline["meta"][key] for key in sizes):
+        raise SystemExit(f"baseline was run with {({k: baseline['meta'][k] for k in sizes})}, "
+                         f"not {({k: report['meta'][k] for k in sizes})}; rerun with the same sizes")
+    regressions = []
+    print(f"{'case':>20} {'baseline ms':>12} {'now ms':>10} {'change':>8}", file=sys.stderr)
+    for name, before in sorted(baseline["results"].items()):
+        now = report["results"].get(name)
+        if now is None:
+            print(f"{name:>20} {before['median_ms']:>12.3f} {'skipped':>10}", file=sys.stderr)
+            continue
+        change = now["median_ms"] / before["median_ms"] - 1 if before["median_ms"] else 0.0
+        regressed = change > tolerance and now["median_ms"] - before["median_ms"] > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:>20} {before['median_ms']:>12.3f} {now['median_ms']:>10.3f} {change:>+8.0%}"
+              f"{'  REGRESSION' if regressed else ''}", file=sys.stderr)
+    return regressions
+
+
+def bench_suite(students, questions, repeat, output, baseline_path, save_baseline, tolerance, min_delta_ms):
+    report = run_suite(students, questions, repeat)
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if save_baseline:
+        with open(save_baseline, "w") as file:
+            file.write(text + "\n")
+    if report["skipped"]:
+        print(f"skipped (no display or matplotlib): {', '.join(report['skipped'])}", file=sys.stderr)
+    if baseline_path:
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        regressions = compare_to_baseline(report, baseline, tolerance, min_delta_ms)
+        if regressions:
+            print(f"FAILED: {len(regressions)} regressions beyond {tolerance:.0%}: {', '.join(regressions)}",
+                  file=sys.stderr)
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    login = sub.add_parser("login", help="login latency: users table vs student_info.csv scan")
+    login.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+
+    render = sub.add_parser("render", help="per-question render latency of display_question")
+    render.add_argument("--questions", type=int, default=500)
+
+    loadtest = sub.add_parser("loadtest", help="concurrent headless quiz sessions against one database")
+    loadtest.add_argument("--students", type=int, default=2000)
+    loadtest.add_argument("--workers", type=int, default=32)
+    loadtest.add_argument("--questions", type=int, default=50)
+
+    submit = sub.add_parser("submit", help="simultaneous quiz submissions: per-row commits vs group commit")
+    submit.add_argument("--submitters", type=int, default=1000)
+
+    timer = sub.add_parser("timer", help="quiz countdown drift, wakeups and CPU over a long exam")
+    timer.add_argument("--hours", type=float, default=3)
+    timer.add_argument("--max-lag-ms", type=int, default=50)
+
+    memory = sub.add_parser("memory", help="memory of an in-memory question bank by layout")
+    memory.add_argument("--questions", type=int, default=1000000)
+
+    dedup = sub.add_parser("dedup", help="duplicate checks on import and a batch scan of a whole bank")
+    dedup.add_argument("--questions", type=int, default=1000000)
+    dedup.add_argument("--duplicate-rate", type=float, default=0.05)
+
+    pack = sub.add_parser("pack", help="subject load time and memory: CSV vs table pages vs mapped pack")
+    pack.add_argument("--questions", type=int, default=1000000)
+
+    roster = sub.add_parser("roster", help="incremental roster sync vs rehashing the whole roster")
+    roster.add_argument("--students", type=int, default=400000)
+    roster.add_argument("--changes", type=int, default=3000)
+
+    suite = sub.add_parser("suite", help="time every main code path; JSON out, fails on regressions")
+    suite.add_argument("--students", type=int, default=100000)
+    suite.add_argument("--questions", type=int, default=20000)
+    suite.add_argument("--repeat", type=int, default=5)
+    suite.add_argument("--output", help="write the JSON report here instead of stdout")
+    suite.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    suite.add_argument("--save-baseline", help="also write this run's report here")
+    suite.add_argument("--tolerance", type=float, default=0.3,
+                       help="allowed slowdown of a case's median, as a fraction")
+    suite.add_argument("--min-delta-ms", type=float, default=0.05,
+                       help="ignore slowdowns smaller than this many milliseconds")
+
+    args = parser.parse_args()
+    if args.benchmark == "login":
+        bench_login(args.sizes)
+    elif args.benchmark == "render":
+        bench_render(args.questions)
+    elif args.benchmark == "loadtest":
+        bench_loadtest(args.students, args.workers, args.questions)
+    elif args.benchmark == "submit":
+        bench_submit(args.submitters)
+    elif args.benchmark == "timer":
+        bench_timer(args.hours, args.max_lag_ms)
+    elif args.benchmark == "memory":
+        bench_memory(args.questions)
+    elif args.benchmark == "dedup":
+        bench_dedup(args.questions, args.duplicate_rate)
+    elif args.benchmark == "pack":
+        bench_pack(args.questions)
+    elif args.benchmark == "roster":
+        bench_roster(args.students, args.changes)
+    elif args.benchmark == "suite":
+        bench_suite(args.students, args.questions, args.repeat, args.output, args.baseline,
+                    args.save_baseline, args.tolerance, args.min_delta_ms)
+
+
+if __name__ == "__main__":
+    main()
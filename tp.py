@@ -1,20 +1,2967 @@
-from datetime import time
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, Frame, Toplevel, filedialog
 import os
 import csv
-import shutil
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import sqlite3
+import hashlib
+import hmac
+import secrets
+import zlib
+import struct
+import mmap
+import re
+import math
+import random
+import bisect
+from array import array
+import sys
+import json
+import argparse
+import queue
+import threading
+import functools
+import atexit
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+
+# matplotlib and NumPy are imported on first use; they dominate cold start.
+# asyncio and http are imported by QuizServer, as only --server needs them.
+_numpy = False
+
+# Custom styles and colors
+BG_COLOR = "#f5f5f5"
+PRIMARY_COLOR = "#4a6fa5"
+SECONDARY_COLOR = "#166088"
+ACCENT_COLOR = "#4fc3f7"
+TEXT_COLOR = "#333333"
+ERROR_COLOR = "#d32f2f"
+SUCCESS_COLOR = "#388e3c"
+
+# Data files
+DB_FILE = "quiz_master.db"
+STUDENT_FILE = "student_info.csv"
+# Secret for roster row hashes, kept beside the database instead of in it
+ROSTER_KEY_FILE = "roster.key"
+COMPLETED_FILE = "completed_quizzes.txt"
+TIMER_FILE = "timer_settings.txt"
+THEME_FILE = "theme_settings.txt"
+
+# Subjects a new catalog starts with, and their legacy question files,
+# imported into the quizzes table on first use
+SUBJECT_FILES = {
+    "Power Device and Circuit": "power_device_and_circuit_questions.csv",
+    "Advance Java Programming": "advance_java_programming_questions.csv",
+    "Project Management": "project_management_questions.csv",
+    "Cellular Network": "cellular_network_questions.csv"
+}
+
+# Quiz length used when no timer has been configured
+DEFAULT_QUIZ_SECONDS = 300
+
+# Questions fetched from the database per round trip
+QUESTION_PAGE_SIZE = 50
+
+# Memory budget for cached question pages shared by all sessions in a process
+QUESTION_CACHE_BYTES = 32 * 1024 * 1024
+
+# Height of a review screen row with a one-line question, in pixels; rows
+# with longer questions grow to fit their wrapped text
+REVIEW_ROW_HEIGHT = 96
+
+# Rows written per executemany call during CSV imports
+IMPORT_BATCH_SIZE = 5000
+
+# Rejected rows listed individually in an import report
+MAX_REPORTED_REJECTS = 20
+
+ANSWER_LETTERS = ("A", "B", "C", "D")
+
+# One-byte codes for answers in the scoring engine
+ANSWER_CODES = {letter: code for code, letter in enumerate(ANSWER_LETTERS)}
+UNANSWERED = 255
+
+# Compiled question packs, used instead of the database when still current
+PACK_DIR = "question_packs"
+PACK_MAGIC = b"QMPK"
+PACK_FORMAT = 1
+# magic, format, subject length, question count, bank version, table offset, heap offset, crc32
+PACK_HEADER = struct.Struct("<4sHHIQQQI")
+
+# Duplicate detection: questions whose word sets overlap at least this much
+# (Jaccard) count as near-duplicates. Signatures have 32 one-permutation
+# MinHash bins of 16 bits, matched in 8 LSH bands of 4 bins each.
+NEAR_DUPLICATE_THRESHOLD = 0.8
+MINHASH_BINS = 32
+LSH_BAND_ROWS = 4
+# A band shared by very many questions says little; it adds at most this many candidates
+LSH_BAND_CANDIDATES = 100
+
+# Hot-path instrumentation, enabled by the QUIZ_METRICS environment variable
+METRICS_FILE = "quiz_metrics.jsonl"
+METRICS_DUMP_SECONDS = 60
+METRICS_MAX_BYTES = 1024 * 1024
+METRICS_BACKUPS = 3
+
+# PBKDF2 rounds used for the password hashes in the users table; the
+# password_iterations setting overrides it for new and upgraded hashes
+PASSWORD_ITERATIONS = 100000
+
+# Password checks run on this many threads so logins never block the UI
+LOGIN_WORKERS = min(8, os.cpu_count() or 1)
+# A verified login is remembered this long, so signing in again skips PBKDF2
+VERIFIED_LOGIN_SECONDS = 300
+# Lifetime of the session token issued at login, renewed on every screen change
+SESSION_SECONDS = 8 * 60 * 60
+# How often the Tk thread checks for a finished password check
+LOGIN_POLL_MS = 10
+# How often the server drops sessions whose token has expired
+SESSION_SWEEP_SECONDS = 60
+
+# Threads for file and database work started from the UI
+DATA_WORKERS = 2
+# How often the Tk thread polls running jobs for progress and results
+JOB_POLL_MS = 20
+# No UI callback may hold the mainloop longer than this; with QUIZ_METRICS
+# set, a timer firing every MAINLOOP_CHECK_MS records how late it runs
+MAINLOOP_BUDGET_MS = 50
+MAINLOOP_CHECK_MS = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    salt TEXT NOT NULL,
+    is_admin INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    row_hash INTEGER
+);
+CREATE TABLE IF NOT EXISTS quizzes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject TEXT NOT NULL,
+    question TEXT NOT NULL,
+    option_a TEXT NOT NULL,
+    option_b TEXT NOT NULL,
+    option_c TEXT NOT NULL,
+    option_d TEXT NOT NULL,
+    correct_answer TEXT NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_quizzes_subject ON quizzes (subject, id);
+CREATE TABLE IF NOT EXISTS subjects (
+    name TEXT PRIMARY KEY,
+    legacy_file TEXT,
+    question_count INTEGER NOT NULL DEFAULT 0,
+    bank_bytes INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS quizzes_catalog_insert AFTER INSERT ON quizzes
+BEGIN
+    INSERT INTO subjects (name, question_count, bank_bytes, updated_at) VALUES (
+        NEW.subject, 1,
+        length(CAST(NEW.question AS BLOB)) + length(CAST(NEW.option_a AS BLOB))
+            + length(CAST(NEW.option_b AS BLOB)) + length(CAST(NEW.option_c AS BLOB))
+            + length(CAST(NEW.option_d AS BLOB)) + length(CAST(NEW.correct_answer AS BLOB)),
+        CURRENT_TIMESTAMP)
+    ON CONFLICT (name) DO UPDATE SET
+        question_count = question_count + 1,
+        bank_bytes = bank_bytes + excluded.bank_bytes,
+        updated_at = excluded.updated_at;
+END;
+CREATE TRIGGER IF NOT EXISTS quizzes_catalog_delete AFTER DELETE ON quizzes
+BEGIN
+    UPDATE subjects SET
+        question_count = question_count - 1,
+        bank_bytes = bank_bytes - (
+            length(CAST(OLD.question AS BLOB)) + length(CAST(OLD.option_a AS BLOB))
+            + length(CAST(OLD.option_b AS BLOB)) + length(CAST(OLD.option_c AS BLOB))
+            + length(CAST(OLD.option_d AS BLOB)) + length(CAST(OLD.correct_answer AS BLOB))),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE name = OLD.subject;
+END;
+CREATE TABLE IF NOT EXISTS question_sample_index (
+    subject TEXT NOT NULL,
+    first_ordinal INTEGER NOT NULL,
+    first_id INTEGER NOT NULL,
+    run_length INTEGER NOT NULL,
+    PRIMARY KEY (subject, first_ordinal)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS question_fingerprints (
+    question_id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    text_hash INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_hash ON question_fingerprints (subject, text_hash);
+CREATE TABLE IF NOT EXISTS question_lsh (
+    subject TEXT NOT NULL,
+    band_key INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    PRIMARY KEY (subject, band_key, question_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS quiz_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    total_questions INTEGER NOT NULL,
+    completed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_results_user ON quiz_results (user_id, subject);
+CREATE TABLE IF NOT EXISTS user_subject_stats (
+    user_id INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    percent_total REAL NOT NULL,
+    best_percent REAL NOT NULL,
+    last_percent REAL NOT NULL,
+    last_completed_at TEXT,
+    PRIMARY KEY (user_id, subject)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS subject_stats (
+    subject TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    percent_total REAL NOT NULL,
+    best_percent REAL NOT NULL,
+    last_percent REAL NOT NULL,
+    last_completed_at TEXT
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS quiz_results_stats AFTER INSERT ON quiz_results
+BEGIN
+    INSERT INTO user_subject_stats VALUES (
+        NEW.user_id, NEW.subject, 1,
+        100.0 * NEW.score / MAX(NEW.total_questions, 1),
+        100.0 * NEW.score / MAX(NEW.total_questions, 1),
+        100.0 * NEW.score / MAX(NEW.total_questions, 1),
+        NEW.completed_at)
+    ON CONFLICT (user_id, subject) DO UPDATE SET
+        attempts = attempts + 1,
+        percent_total = percent_total + excluded.last_percent,
+        best_percent = MAX(best_percent, excluded.best_percent),
+        last_percent = excluded.last_percent,
+        last_completed_at = excluded.last_completed_at;
+    INSERT INTO subject_stats VALUES (
+        NEW.subject, 1,
+        100.0 * NEW.score / MAX(NEW.total_questions, 1),
+        100.0 * NEW.score / MAX(NEW.total_questions, 1),
+        100.0 * NEW.score / MAX(NEW.total_questions, 1),
+        NEW.completed_at)
+    ON CONFLICT (subject) DO UPDATE SET
+        attempts = attempts + 1,
+        percent_total = percent_total + excluded.last_percent,
+        best_percent = MAX(best_percent, excluded.best_percent),
+        last_percent = excluded.last_percent,
+        last_completed_at = excluded.last_completed_at;
+END;
+CREATE TABLE IF NOT EXISTS completed_quizzes (
+    user_id INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    completed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, subject)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS quiz_results_completed AFTER INSERT ON quiz_results
+BEGIN
+    INSERT OR IGNORE INTO completed_quizzes (user_id, subject, completed_at)
+    VALUES (NEW.user_id, NEW.subject, NEW.completed_at);
+END;
+CREATE TABLE IF NOT EXISTS settings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    setting_name TEXT UNIQUE NOT NULL,
+    setting_value TEXT NOT NULL
+);
+"""
+
+
+class LatencyStats:
+    """Call count, latency histogram and I/O bytes of one instrumented path.
+
+    Latencies go into buckets that grow by 25% from one microsecond, so a
+    percentile is accurate to within a bucket whatever the range.
+    """
+
+    __slots__ = ("count", "total", "max", "buckets", "read_bytes", "write_bytes")
+    GROWTH = 1.25
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}
+        self.read_bytes = 0
+        self.write_bytes = 0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        micros = seconds * 1e6
+        bucket = int(math.log(micros, self.GROWTH)) + 1 if micros >= 1 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile_ms(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile, in milliseconds"""
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.GROWTH ** bucket / 1000, self.max * 1000)
+        return 0.0
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile_ms(50), 3),
+            "p95_ms": round(self.percentile_ms(95), 3),
+            "p99_ms": round(self.percentile_ms(99), 3),
+            "max_ms": round(self.max * 1000, 3),
+            "read_bytes": self.read_bytes,
+            "write_bytes": self.write_bytes,
+        }
+
+
+class Metrics:
+    """Opt-in timing of the hot paths, dumped to a rotating JSON-lines file.
+
+    Set QUIZ_METRICS to 1 (or to the file to write instead of
+    quiz_metrics.jsonl) to enable it. Methods decorated with timed() then
+    record their latency and the file and database bytes the process read
+    and wrote during the call, taken from /proc/self/io where it exists.
+    With the variable unset timed() returns the function unchanged, so the
+    disabled layer adds nothing to any call.
+    """
+
+    def __init__(self, setting=None):
+        self.enabled = bool(setting)
+        self.path = METRICS_FILE if setting in (None, "", "1") else setting
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.last_dump = time.monotonic()
+        self.io_fd = None
+        if self.enabled:
+            try:
+                self.io_fd = os.open("/proc/self/io", os.O_RDONLY)
+            except OSError:
+                pass
+            atexit.register(self.dump)
+
+    def timed(self, name):
+        def decorate(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                io_before = self.read_io()
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started, io_before)
+            return wrapper
+        return decorate
+
+    def read_io(self):
+        """(read, written, size of this read) in bytes, or None without /proc/self/io"""
+        if self.io_fd is None:
+            return None
+        text = os.pread(self.io_fd, 512, 0)
+        fields = text.split()
+        return int(fields[1]), int(fields[3]), len(text)
+
+    def record(self, name, seconds, io_before):
+        io_after = self.read_io()
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = LatencyStats()
+            stats.add(seconds)
+            if io_before is not None:
+                # The first /proc read is itself counted in the read bytes
+                stats.read_bytes += io_after[0] - io_before[0] - io_before[2]
+                stats.write_bytes += io_after[1] - io_before[1]
+        if time.monotonic() - self.last_dump >= METRICS_DUMP_SECONDS:
+            self.dump()
+
+    def snapshot(self):
+        with self.lock:
+            return {name: stats.summary() for name, stats in sorted(self.stats.items())}
+
+    def dump(self):
+        """Append one line with every path's summary so far, rotating the file when it is full"""
+        self.last_dump = time.monotonic()
+        if not self.stats:
+            return
+        line = json.dumps({"time": round(time.time(), 3), "pid": os.getpid(), "paths": self.snapshot()})
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > METRICS_MAX_BYTES:
+                for index in range(METRICS_BACKUPS - 1, 0, -1):
+                    if os.path.exists(f"{self.path}.{index}"):
+                        os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a") as file:
+                file.write(line + "\n")
+        except OSError:
+            # Instrumentation must never take the app down with it
+            pass
+
+
+METRICS = Metrics(os.environ.get("QUIZ_METRICS"))
+
+
+def connect_db(db_path=DB_FILE):
+    """Open the quiz database, creating any missing tables.
+
+    The database runs in WAL mode so readers never block the result writer
+    and concurrent submissions only contend for the single write lock.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    # Columns added after the first release; CREATE TABLE IF NOT EXISTS leaves older tables as they are
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    for column, definition in (("is_active", "INTEGER NOT NULL DEFAULT 1"), ("row_hash", "INTEGER")):
+        if column not in columns:
+            try:
+                conn.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise
+    return conn
+
+
+class UserStore:
+    """Student and admin credentials kept in the users table.
+
+    Lookups go through the UNIQUE index on username, so a login costs one
+    index probe plus one PBKDF2 hash no matter how many students exist.
+    Students dropped from the roster are deactivated, not deleted, so their
+    results stay; inactive accounts cannot log in.
+    """
+
+    # Hashed against for unknown usernames, so they cost as much as known ones
+    MISSING_USER_SALT = "0" * 32
+
+    def __init__(self, db_path=DB_FILE, iterations=PASSWORD_ITERATIONS):
+        self.db_path = db_path
+        self.iterations = iterations
+        self.conn = connect_db(db_path)
+        self.key = None
+        self.ensure_admin()
+
+    def roster_key(self):
+        """The secret for row_hash, created on first use.
+
+        row_hash is a fast hash of the password, so unlike the PBKDF2 hash it
+        must not be computable from the database alone.
+        """
+        if self.key is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(self.db_path)), ROSTER_KEY_FILE)
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                with open(path, "rb") as file:
+                    self.key = file.read()
+            else:
+                self.key = secrets.token_bytes(32)
+                with os.fdopen(fd, "wb") as file:
+                    file.write(self.key)
+        return self.key
+
+    def row_hash(self, username, password):
+        """Keyed 64-bit hash of a roster row, compared to spot changed passwords without PBKDF2"""
+        digest = hmac.new(self.roster_key(), f"{username}\0{password}".encode(), "sha256").digest()
+        return int.from_bytes(digest[:8], "little", signed=True)
+
+    @staticmethod
+    def hash_password(password, salt, iterations=PASSWORD_ITERATIONS):
+        """Return the stored form of a password hash"""
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations).hex()
+        if iterations == PASSWORD_ITERATIONS:
+            return digest
+        # Non-default costs are recorded next to the digest so they still verify
+        return f"{iterations}${digest}"
+
+    @staticmethod
+    def hash_iterations(stored_hash):
+        if "$" in stored_hash:
+            return int(stored_hash.split("$", 1)[0])
+        return PASSWORD_ITERATIONS
+
+    @staticmethod
+    def verify_password(password, salt, stored_hash):
+        candidate = UserStore.hash_password(password, salt, UserStore.hash_iterations(stored_hash))
+        return hmac.compare_digest(candidate, stored_hash)
+
+    def ensure_admin(self):
+        """Seed the default admin/admin account when no admin exists"""
+        row = self.conn.execute("SELECT 1 FROM users WHERE is_admin = 1 LIMIT 1").fetchone()
+        if row is None:
+            self.add_user("admin", "admin", is_admin=True)
+
+    def add_user(self, username, password, is_admin=False):
+        """Insert a user, returning False if the username is taken"""
+        salt = secrets.token_hex(16)
+        password_hash = self.hash_password(password, salt, self.iterations)
+        row_hash = None if is_admin else self.row_hash(username, password)
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO users (username, password_hash, salt, is_admin, row_hash) VALUES (?, ?, ?, ?, ?)",
+                    (username, password_hash, salt, int(is_admin), row_hash))
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def lookup(self, username):
+        """Return (id, password_hash, salt, is_admin) for an active username, or None"""
+        return self.conn.execute(
+            "SELECT id, password_hash, salt, is_admin FROM users WHERE username = ? AND is_active = 1",
+            (username,)).fetchone()
+
+    @staticmethod
+    def check_credentials(row, username, password, iterations=PASSWORD_ITERATIONS):
+        """Verify a password against a lookup() row; returns the user dict or None.
+
+        Touches no connection, so it can run on any thread. Without a row a
+        PBKDF2 of the given cost still runs, so the response time does not
+        tell whether the username exists.
+        """
+        if row is None:
+            UserStore.hash_password(password, UserStore.MISSING_USER_SALT, iterations)
+            return None
+        user_id, password_hash, salt, is_admin = row
+        if not UserStore.verify_password(password, salt, password_hash):
+            return None
+        return {"id": user_id, "username": username, "is_admin": bool(is_admin)}
+
+    def authenticate(self, username, password):
+        """Return {"id", "username", "is_admin"} for valid credentials, else None"""
+        return self.check_credentials(self.lookup(username), username, password, self.iterations)
+
+    def count_students(self):
+        """(active, inactive) student counts"""
+        row = self.conn.execute(
+            "SELECT COALESCE(SUM(is_active), 0), COUNT(*) - COALESCE(SUM(is_active), 0) "
+            "FROM users WHERE is_admin = 0").fetchone()
+        return row[0], row[1]
+
+    def list_students(self, prefix="", limit=500):
+        """Up to limit (username, is_active, created_at) rows whose username starts with prefix.
+
+        A range scan of the username index, so it stays fast with any number
+        of students.
+        """
+        return self.conn.execute(
+            "SELECT username, is_active, created_at FROM users "
+            "WHERE is_admin = 0 AND username >= ? AND username < ? ORDER BY username LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit)).fetchall()
+
+    def set_password_hash(self, user_id, password_hash, salt):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE users SET password_hash = ?, salt = ? WHERE id = ?", (password_hash, salt, user_id))
+
+    def migration_pending(self, csv_path=STUDENT_FILE):
+        """True while student_info.csv exists and has not been imported yet"""
+        done = self.conn.execute(
+            "SELECT 1 FROM settings WHERE setting_name = 'students_migrated'").fetchone()
+        return not done and os.path.exists(csv_path)
+
+    def migrate_from_csv(self, csv_path=STUDENT_FILE, progress=None):
+        """One-time import of the legacy student_info.csv into the users table.
+
+        Returns the number of students added. A marker in the settings table
+        makes later calls a no-op.
+        """
+        if not self.migration_pending(csv_path):
+            return 0
+
+        report = self.import_csv(csv_path, progress=progress)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO settings (setting_name, setting_value) VALUES ('students_migrated', '1')")
+        return report.imported
+
+    def import_csv(self, file_path, batch_size=IMPORT_BATCH_SIZE, progress=None, workers=LOGIN_WORKERS):
+        """Stream a username,password CSV into the users table in one transaction.
+
+        Existing usernames are left untouched and counted as skipped.
+        Passwords are hashed a batch at a time on a thread pool, as in
+        sync_roster(). Returns an ImportReport.
+        """
+        report = ImportReport()
+        batch = []
+
+        def hashed(row):
+            salt = secrets.token_hex(16)
+            return row[0], self.hash_password(row[1], salt, self.iterations), salt, self.row_hash(row[0], row[1])
+
+        def flush():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password_hash, salt, row_hash) VALUES (?, ?, ?, ?)",
+                list(pool.map(hashed, batch)))
+            added = self.conn.total_changes - before
+            report.imported += added
+            report.skipped += len(batch) - added
+            batch.clear()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool, self.conn:
+            for row in stream_csv(file_path, validate_student_row, report, progress, columns=STUDENT_COLUMNS):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    flush()
+            flush()
+        report.finish()
+        return report
+
+    def sync_roster(self, file_path, batch_size=IMPORT_BATCH_SIZE, progress=None, workers=LOGIN_WORKERS):
+        """Make the student accounts match a full username,password roster, in one transaction.
+
+        The file is streamed a batch at a time and each batch is matched to
+        the stored accounts by username. Rows whose row_hash is unchanged
+        cost no PBKDF2; only new and changed passwords are hashed, on a
+        thread pool, and written with one upsert. Students missing from the
+        roster are deactivated, and reactivated if they come back. Admin
+        accounts are never touched. Returns a RosterSyncReport.
+        """
+        report = RosterSyncReport()
+        pending = {}
+
+        def flush():
+            stored = {}
+            names = list(pending)
+            for start in range(0, len(names), 500):
+                chunk = names[start:start + 500]
+                for row in self.conn.execute(
+                        "SELECT username, id, is_admin, is_active, row_hash, password_hash, salt FROM users "
+                        f"WHERE username IN ({','.join('?' * len(chunk))})", chunk):
+                    stored[row[0]] = row[1:]
+
+            seen, reactivate, rehash, legacy = [], [], [], []
+            for username, (password, row_hash) in pending.items():
+                account = stored.get(username)
+                if account is None:
+                    rehash.append((username, password, row_hash))
+                    continue
+                user_id, is_admin, is_active, stored_hash = account[:4]
+                if is_admin:
+                    report.skipped += 1
+                    continue
+                seen.append((user_id,))
+                if stored_hash is None:
+                    # Accounts from before row hashes; checked once with PBKDF2
+                    legacy.append((username, password, row_hash, account))
+                elif stored_hash != row_hash:
+                    rehash.append((username, password, row_hash))
+                elif is_active:
+                    report.unchanged += 1
+                else:
+                    reactivate.append((user_id,))
+            pending.clear()
+
+            for (username, password, row_hash, account), same in zip(legacy, pool.map(
+                    lambda item: self.verify_password(item[1], item[3][5], item[3][4]), legacy)):
+                if not same:
+                    rehash.append((username, password, row_hash))
+                    continue
+                self.conn.execute("UPDATE users SET row_hash = ?, is_active = 1 WHERE id = ?",
+                                  (row_hash, account[0]))
+                if account[2]:
+                    report.unchanged += 1
+                else:
+                    report.reactivated += 1
+
+            def hashed(item):
+                salt = secrets.token_hex(16)
+                return item[0], self.hash_password(item[1], salt, self.iterations), salt, item[2]
+
+            rows = list(pool.map(hashed, rehash))
+            self.conn.executemany(
+                "INSERT INTO users (username, password_hash, salt, row_hash) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET password_hash = excluded.password_hash, "
+                "salt = excluded.salt, row_hash = excluded.row_hash, is_active = 1", rows)
+            added = [(username,) for username, _, _, _ in rows if username not in stored]
+            report.imported += len(added)
+            report.updated += len(rows) - len(added)
+            self.conn.executemany("UPDATE users SET is_active = 1 WHERE id = ?", reactivate)
+            report.reactivated += len(reactivate)
+            self.conn.executemany("INSERT OR IGNORE INTO temp.roster_seen (user_id) VALUES (?)", seen)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO temp.roster_seen (user_id) SELECT id FROM users WHERE username = ?", added)
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS roster_seen (user_id INTEGER PRIMARY KEY)")
+        with ThreadPoolExecutor(max_workers=workers) as pool, self.conn:
+            self.conn.execute("DELETE FROM temp.roster_seen")
+            for username, password in stream_csv(file_path, validate_student_row, report, progress, columns=STUDENT_COLUMNS):
+                if username in pending:
+                    report.skipped += 1
+                pending[username] = (password, self.row_hash(username, password))
+                if len(pending) >= batch_size:
+                    flush()
+            flush()
+            report.deactivated = self.conn.execute(
+                "UPDATE users SET is_active = 0 WHERE is_admin = 0 AND is_active = 1 "
+                "AND id NOT IN (SELECT user_id FROM temp.roster_seen)").rowcount
+            self.conn.execute("DELETE FROM temp.roster_seen")
+        report.finish()
+        return report
+
+
+class LoginVerifier:
+    """Checks passwords on a worker pool and remembers recent successes.
+
+    PBKDF2 releases the GIL, so checks run in parallel with each other and
+    with the Tk mainloop or the server's event loop. verify() returns a
+    Future of (user or None, upgrade or None); upgrade is a (hash, salt)
+    pair when the stored hash used a different cost than the configured
+    one, for the caller to save.
+
+    A successful check is remembered for VERIFIED_LOGIN_SECONDS under a
+    keyed SHA-256 of the password, so signing in again soon costs no KDF.
+    The entry only matches while the user's stored hash is unchanged.
+    Session tokens issued at login let screens confirm who is signed in
+    without asking for the password again.
+    """
+
+    def __init__(self, iterations=PASSWORD_ITERATIONS, workers=LOGIN_WORKERS, now=time.monotonic):
+        self.iterations = iterations
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="login")
+        self.now = now
+        # Process-local, so remembered digests are useless outside this process
+        self.key = secrets.token_bytes(32)
+        self.verified = {}
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def digest(self, username, password):
+        return hmac.new(self.key, f"{username}\0{password}".encode(), "sha256").digest()
+
+    def verify(self, row, username, password):
+        """Check a password against a UserStore.lookup() row"""
+        result = self.recall(row, username, password)
+        if result is None:
+            return self.pool.submit(self.check, row, username, password)
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def recall(self, row, username, password):
+        if row is None:
+            return None
+        with self.lock:
+            entry = self.verified.get(username)
+        if entry is None:
+            return None
+        digest, checked_hash, user, upgrade, expires = entry
+        if self.now() >= expires or not hmac.compare_digest(digest, self.digest(username, password)):
+            return None
+        if row[1] == checked_hash:
+            # Hand out the same upgrade until the caller has saved it
+            return user, upgrade
+        if upgrade is not None and row[1] == upgrade[0]:
+            return user, None
+        return None
+
+    def check(self, row, username, password):
+        user = UserStore.check_credentials(row, username, password, self.iterations)
+        if user is None:
+            return None, None
+        upgrade = None
+        if UserStore.hash_iterations(row[1]) != self.iterations:
+            salt = secrets.token_hex(16)
+            upgrade = (UserStore.hash_password(password, salt, self.iterations), salt)
+        with self.lock:
+            self.verified[username] = (self.digest(username, password), row[1], user, upgrade,
+                                       self.now() + VERIFIED_LOGIN_SECONDS)
+        return user, upgrade
+
+    def issue(self, user):
+        """Start a signed-in session; returns its token"""
+        token = secrets.token_urlsafe(24)
+        with self.lock:
+            self.tokens[token] = (user, self.now() + SESSION_SECONDS)
+        return token
+
+    def user_for(self, token):
+        """The user a live token belongs to, extending its lifetime, or None"""
+        with self.lock:
+            entry = self.tokens.get(token)
+            if entry is None:
+                return None
+            if self.now() >= entry[1]:
+                del self.tokens[token]
+                return None
+            self.tokens[token] = (entry[0], self.now() + SESSION_SECONDS)
+            return entry[0]
+
+    def revoke(self, token):
+        with self.lock:
+            self.tokens.pop(token, None)
+
+    def purge(self):
+        """Forget expired logins and sessions; returns the expired session tokens"""
+        now = self.now()
+        with self.lock:
+            expired = [token for token, (_, expires) in self.tokens.items() if now >= expires]
+            for token in expired:
+                del self.tokens[token]
+            for username in [name for name, entry in self.verified.items() if now >= entry[-1]]:
+                del self.verified[username]
+        return expired
+
+
+class QuestionCache:
+    """LRU cache of question pages with a memory budget.
+
+    Every entry carries the bank version it was read at; a lookup with a
+    different version is a miss, so edits to a subject invalidate its pages
+    without any explicit flush.
+    """
+
+    def __init__(self, max_bytes=QUESTION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, version, value, size):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes_used -= old[2]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (version, value, size)
+        self.bytes_used += size
+        while self.bytes_used > self.max_bytes:
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.bytes_used -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes_used = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.bytes_used,
+        }
+
+
+class CompactQuestions:
+    """Columnar question store: about a third of the memory of a list of rows.
+
+    Question texts are kept in one list, the four options of every question
+    as indices into a pool of distinct option strings (so "True", "None of
+    the above" and the like are stored once), and the correct answer as one
+    byte code. Indexing returns a (question, a, b, c, d, answer) tuple, which
+    is all display_question and the review screen need.
+    """
+
+    __slots__ = ("texts", "options", "answers", "pool", "pool_ids")
+
+    def __init__(self, rows=()):
+        self.texts = []
+        self.options = array("I")
+        self.answers = bytearray()
+        self.pool = []
+        self.pool_ids = {}
+        for row in rows:
+            self.append(row)
+
+    def append(self, row):
+        self.texts.append(row[0])
+        for option in row[1:5]:
+            option_id = self.pool_ids.get(option)
+            if option_id is None:
+                option_id = self.pool_ids[option] = len(self.pool)
+                self.pool.append(sys.intern(option))
+            self.options.append(option_id)
+        self.answers.append(ANSWER_CODES[row[5]])
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        text = self.texts[index]
+        if index < 0:
+            index += len(self.texts)
+        pool = self.pool
+        a, b, c, d = self.options[4 * index:4 * index + 4]
+        return (text, pool[a], pool[b], pool[c], pool[d], ANSWER_LETTERS[self.answers[index]])
+
+    def __iter__(self):
+        for index in range(len(self.texts)):
+            yield self[index]
+
+    def answer_key(self):
+        """Correct answers as ANSWER_CODES bytes, ready for ScoringEngine"""
+        return bytes(self.answers)
+
+    def nbytes(self):
+        """Approximate memory held, including the strings themselves"""
+        size = sys.getsizeof(self.texts) + sum(sys.getsizeof(text) for text in self.texts)
+        size += sys.getsizeof(self.pool) + sum(sys.getsizeof(option) for option in self.pool)
+        size += sys.getsizeof(self.pool_ids) + sys.getsizeof(self.options) + sys.getsizeof(self.answers)
+        return size
+
+
+def estimate_page_size(page):
+    """Approximate memory held by an (ids, CompactQuestions) page"""
+    ids, questions = page
+    return sys.getsizeof(ids) + questions.nbytes()
+
+
+NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_question(text):
+    """Lower-case words separated by single spaces, without punctuation"""
+    return NON_WORD.sub(" ", text.lower()).strip()
+
+
+def stable_hash(data):
+    """Signed 64-bit hash that, unlike hash(), is the same in every process"""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=True)
+
+
+def question_shingles(normalized):
+    """The set of words of a normalized question, as bytes"""
+    return set(normalized.encode("utf-8").split()) or {b""}
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+# For each bin, the fixed pseudo-random order in which an empty bin looks for a filled one
+DENSIFY_ORDER = [random.Random(i).sample(range(MINHASH_BINS), MINHASH_BINS) for i in range(MINHASH_BINS)]
+
+
+def minhash_signature(shingles):
+    """One-permutation MinHash: hash every shingle once and keep the minimum per bin.
+
+    Empty bins borrow from a filled bin chosen by their own probe order, so
+    short questions still get a full signature and neighbouring empty bins
+    (which share an LSH band) rarely borrow from the same place.
+    """
+    bin_shift = 32 - (MINHASH_BINS.bit_length() - 1)
+    value_mask = (1 << bin_shift) - 1
+    bins = [None] * MINHASH_BINS
+    for crc in map(zlib.crc32, shingles):
+        mixed = (crc * 0x9E3779B1) & 0xFFFFFFFF
+        index = mixed >> bin_shift
+        value = mixed & value_mask
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    signature = []
+    for i, value in enumerate(bins):
+        if value is None:
+            for j in DENSIFY_ORDER[i]:
+                if bins[j] is not None:
+                    value = bins[j] + 40503 * (i + 1)
+                    break
+        signature.append(value & 0xFFFF)
+    return signature
+
+
+def lsh_band_keys(signature):
+    """One signed 64-bit key per band: its four 16-bit bins side by side"""
+    return list(array("q", array("H", signature).tobytes()))
+
+
+def question_fingerprint(text):
+    """(text_hash, band_keys, shingles) of a question's text"""
+    normalized = normalize_question(text)
+    shingles = question_shingles(normalized)
+    return stable_hash(normalized.encode("utf-8")), lsh_band_keys(minhash_signature(shingles)), shingles
+
+
+class SubjectCatalog:
+    """The subjects table: every subject with its question count, bank size and last change.
+
+    Triggers on quizzes keep the counts and sizes current as rows come and
+    go, so listing subjects is one small query however big the banks are.
+    A new database is seeded from SUBJECT_FILES and any questions already
+    stored; admins add subjects from then on.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.ensure_seeded()
+
+    def ensure_seeded(self):
+        if self.conn.execute(
+                "SELECT 1 FROM settings WHERE setting_name = 'subjects_seeded'").fetchone():
+            return
+        with self.conn:
+            # Re-checked under the write lock, in case another connection got here first
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.conn.execute(
+                    "SELECT 1 FROM settings WHERE setting_name = 'subjects_seeded'").fetchone():
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO subjects (name, question_count, bank_bytes, updated_at) "
+                "SELECT subject, COUNT(*), SUM(length(CAST(question AS BLOB)) + length(CAST(option_a AS BLOB)) "
+                "+ length(CAST(option_b AS BLOB)) + length(CAST(option_c AS BLOB)) "
+                "+ length(CAST(option_d AS BLOB)) + length(CAST(correct_answer AS BLOB))), MAX(created_at) "
+                "FROM quizzes GROUP BY subject")
+            for name, legacy_file in SUBJECT_FILES.items():
+                self.conn.execute("INSERT OR IGNORE INTO subjects (name) VALUES (?)", (name,))
+                self.conn.execute("UPDATE subjects SET legacy_file = ? WHERE name = ?", (legacy_file, name))
+            self.conn.execute(
+                "INSERT INTO settings (setting_name, setting_value) VALUES ('subjects_seeded', '1')")
+
+    def add(self, name):
+        """Add an empty subject; returns False if it already exists"""
+        with self.conn:
+            return self.conn.execute(
+                "INSERT OR IGNORE INTO subjects (name) VALUES (?)", (name,)).rowcount == 1
+
+    def exists(self, name):
+        return self.conn.execute("SELECT 1 FROM subjects WHERE name = ?", (name,)).fetchone() is not None
+
+    def legacy_file(self, name):
+        row = self.conn.execute("SELECT legacy_file FROM subjects WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def names(self):
+        return [name for name, in self.conn.execute("SELECT name FROM subjects ORDER BY name")]
+
+    def question_count(self, name):
+        row = self.conn.execute("SELECT question_count FROM subjects WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def entries(self):
+        """[(name, question_count, bank_bytes, updated_at, legacy_file)] in name order"""
+        return self.conn.execute(
+            "SELECT name, question_count, bank_bytes, updated_at, legacy_file FROM subjects ORDER BY name"
+        ).fetchall()
+
+
+class DuplicateIndex:
+    """Exact and near-duplicate lookup over the question texts of each subject.
+
+    question_fingerprints holds a hash of every question's normalized text
+    and question_lsh its MinHash band keys, so a lookup is two indexed
+    queries plus a Jaccard check of the few candidates that share a band.
+    QuestionBank keeps the index in step with its own writes; a subject whose
+    index is missing or stale is rebuilt on first use.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def is_current(self, subject, version):
+        row = self.conn.execute(
+            "SELECT setting_value FROM settings WHERE setting_name = ?",
+            ("dedup_index_version:" + subject,)).fetchone()
+        return row is not None and int(row[0]) == version
+
+    def mark_current(self, subject, version):
+        self.conn.execute(
+            "INSERT INTO settings (setting_name, setting_value) VALUES (?, ?) "
+            "ON CONFLICT(setting_name) DO UPDATE SET setting_value = excluded.setting_value",
+            ("dedup_index_version:" + subject, str(version)))
+
+    def clear(self, subject):
+        self.conn.execute("DELETE FROM question_fingerprints WHERE subject = ?", (subject,))
+        self.conn.execute("DELETE FROM question_lsh WHERE subject = ?", (subject,))
+
+    def add_many(self, subject, questions):
+        """Index (question_id, fingerprint) pairs; runs inside the caller's transaction"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO question_fingerprints VALUES (?, ?, ?)",
+            [(question_id, subject, fingerprint[0]) for question_id, fingerprint in questions])
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO question_lsh VALUES (?, ?, ?)",
+            [(subject, band_key, question_id)
+             for question_id, fingerprint in questions for band_key in fingerprint[1]])
+
+    def remove_many(self, subject, questions):
+        """Drop (question_id, question_text) pairs from the index"""
+        self.conn.executemany(
+            "DELETE FROM question_fingerprints WHERE question_id = ?",
+            [(question_id,) for question_id, _ in questions])
+        self.conn.executemany(
+            "DELETE FROM question_lsh WHERE subject = ? AND band_key = ? AND question_id = ?",
+            [(subject, band_key, question_id) for question_id, text in questions
+             for band_key in question_fingerprint(text)[1]])
+
+    def rebuild(self, subject, batch_size=IMPORT_BATCH_SIZE):
+        self.clear(subject)
+        after_id = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, question FROM quizzes WHERE subject = ? AND id > ? ORDER BY id LIMIT ?",
+                (subject, after_id, batch_size)).fetchall()
+            if not rows:
+                return
+            self.add_many(subject, [(question_id, question_fingerprint(text)) for question_id, text in rows])
+            after_id = rows[-1][0]
+
+    def find(self, subject, fingerprint):
+        """Return (question_id, similarity) of the closest indexed duplicate, or None.
+
+        An exact match of the normalized text has similarity 1.0; otherwise
+        the best candidate at or above NEAR_DUPLICATE_THRESHOLD is returned.
+        """
+        return self.find_many(subject, [fingerprint])[0]
+
+    def find_many(self, subject, fingerprints):
+        """find() for a batch of fingerprints, with a few IN queries for the lot"""
+        text_hashes = {fingerprint[0] for fingerprint in fingerprints}
+        exact = {}
+        for text_hash, question_id in self._select_in(
+                "SELECT text_hash, question_id FROM question_fingerprints WHERE subject = ? AND text_hash IN ({})",
+                subject, text_hashes):
+            exact.setdefault(text_hash, question_id)
+
+        band_keys = {band_key for fingerprint in fingerprints if fingerprint[0] not in exact
+                     for band_key in fingerprint[1]}
+        band_members = {}
+        for band_key, question_id in self._select_in(
+                "SELECT band_key, question_id FROM question_lsh WHERE subject = ? AND band_key IN ({})",
+                subject, band_keys):
+            members = band_members.setdefault(band_key, [])
+            if len(members) < LSH_BAND_CANDIDATES:
+                members.append(question_id)
+
+        candidates = [{question_id for band_key in fingerprint[1] for question_id in band_members.get(band_key, ())}
+                      for fingerprint in fingerprints]
+        shingles = {question_id: question_shingles(normalize_question(text)) for question_id, text in self._select_in(
+            "SELECT id, question FROM quizzes WHERE subject = ? AND id IN ({})",
+            subject, set().union(*candidates))}
+
+        matches = []
+        for fingerprint, question_ids in zip(fingerprints, candidates):
+            if fingerprint[0] in exact:
+                matches.append((exact[fingerprint[0]], 1.0))
+                continue
+            best = None
+            for question_id in question_ids:
+                similarity = jaccard(fingerprint[2], shingles.get(question_id))
+                if similarity >= NEAR_DUPLICATE_THRESHOLD and (best is None or similarity > best[1]):
+                    best = (question_id, similarity)
+            matches.append(best)
+        return matches
+
+    def _select_in(self, sql, subject, values, chunk_size=500):
+        values = list(values)
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            yield from self.conn.execute(sql.format(",".join("?" * len(chunk))), (subject, *chunk))
+
+    def duplicate_pairs(self, subject, chunk_size=IMPORT_BATCH_SIZE):
+        """Yield (duplicate_id, original_id, similarity) for a whole subject.
+
+        Every question sharing a text hash or an LSH band with a lower id is
+        checked against the lowest such id, so the earliest copy of each
+        question is the one kept. Candidates are streamed from the index in
+        id order and verified chunk by chunk.
+        """
+        exact = set()
+        for duplicate_id, original_id in self.conn.execute(
+                "SELECT f.question_id, g.first_id FROM question_fingerprints f JOIN ("
+                "  SELECT text_hash, MIN(question_id) AS first_id FROM question_fingerprints "
+                "  WHERE subject = ? GROUP BY text_hash HAVING COUNT(*) > 1"
+                ") g ON f.text_hash = g.text_hash "
+                "WHERE f.subject = ? AND f.question_id > g.first_id ORDER BY f.question_id",
+                (subject, subject)):
+            exact.add(duplicate_id)
+            yield duplicate_id, original_id, 1.0
+
+        pairs = self.conn.execute(
+            "SELECT DISTINCT l.question_id, g.first_id FROM question_lsh l JOIN ("
+            "  SELECT band_key, MIN(question_id) AS first_id FROM question_lsh "
+            "  WHERE subject = ? GROUP BY band_key HAVING COUNT(*) > 1"
+            ") g ON l.band_key = g.band_key "
+            "WHERE l.subject = ? AND l.question_id > g.first_id ORDER BY l.question_id",
+            (subject, subject))
+        reported = exact
+        while True:
+            chunk = pairs.fetchmany(chunk_size)
+            if not chunk:
+                return
+            chunk = [pair for pair in chunk if pair[0] not in reported]
+            ids = list({question_id for pair in chunk for question_id in pair})
+            shingles = {}
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                for question_id, text in self.conn.execute(
+                        f"SELECT id, question FROM quizzes WHERE id IN ({','.join('?' * len(batch))})", batch):
+                    shingles[question_id] = question_shingles(normalize_question(text))
+            for duplicate_id, original_id in chunk:
+                if duplicate_id in reported:
+                    continue
+                similarity = jaccard(shingles.get(duplicate_id), shingles.get(original_id))
+                if similarity >= NEAR_DUPLICATE_THRESHOLD:
+                    reported.add(duplicate_id)
+                    yield duplicate_id, original_id, similarity
+
+
+class QuestionBank:
+    """Question storage on the quizzes table, indexed by (subject, id)"""
+
+    def __init__(self, db_path=DB_FILE, page_size=QUESTION_PAGE_SIZE, cache_bytes=QUESTION_CACHE_BYTES):
+        self.db_path = db_path
+        self.page_size = page_size
+        self.conn = connect_db(db_path)
+        self.cache = QuestionCache(cache_bytes)
+        self.catalog = SubjectCatalog(self.conn)
+        self.duplicates = DuplicateIndex(self.conn)
+        # Open question packs by subject, see open_pack
+        self.packs = {}
+
+    def count(self, subject):
+        """The subject's question count, kept by the catalog triggers; no scan of quizzes"""
+        return self.catalog.question_count(subject)
+
+    def version(self, subject):
+        """Change counter for a subject, bumped by every write through this class"""
+        row = self.conn.execute(
+            "SELECT setting_value FROM settings WHERE setting_name = ?",
+            ("bank_version:" + subject,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _bump_version(self, subject):
+        # Runs inside the caller's write transaction
+        self.conn.execute(
+            "INSERT INTO settings (setting_name, setting_value) VALUES (?, '1') "
+            "ON CONFLICT(setting_name) DO UPDATE SET setting_value = CAST(setting_value AS INTEGER) + 1",
+            ("bank_version:" + subject,))
+        # Every writer here keeps the duplicate index in step with its change
+        self.duplicates.mark_current(subject, self.version(subject))
+
+    def _prepare_duplicates(self, subject):
+        # Runs inside the caller's write transaction, before the subject changes
+        if not self.duplicates.is_current(subject, self.version(subject)):
+            self.duplicates.rebuild(subject)
+
+    def find_duplicate(self, subject, question):
+        """Return (question_id, question_text, similarity) of an existing copy, or None"""
+        if not self.duplicates.is_current(subject, self.version(subject)):
+            with self.conn:
+                self._prepare_duplicates(subject)
+                self.duplicates.mark_current(subject, self.version(subject))
+        match = self.duplicates.find(subject, question_fingerprint(question))
+        if match is None:
+            return None
+        text = self.conn.execute("SELECT question FROM quizzes WHERE id = ?", (match[0],)).fetchone()[0]
+        return match[0], text, match[1]
+
+    def find_duplicates(self, subject):
+        """Batch check of a whole subject: a list of (duplicate_id, original_id, similarity)"""
+        with self.conn:
+            self._prepare_duplicates(subject)
+            self.duplicates.mark_current(subject, self.version(subject))
+        return list(self.duplicates.duplicate_pairs(subject))
+
+    def remove_questions(self, subject, question_ids):
+        """Delete questions by id, e.g. the duplicates found by find_duplicates"""
+        with self.conn:
+            self._prepare_duplicates(subject)
+            for start in range(0, len(question_ids), 500):
+                chunk = list(question_ids[start:start + 500])
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT id, question FROM quizzes WHERE subject = ? AND id IN ({placeholders})",
+                    (subject, *chunk)).fetchall()
+                self.duplicates.remove_many(subject, rows)
+                self.conn.execute(
+                    f"DELETE FROM quizzes WHERE subject = ? AND id IN ({placeholders})", (subject, *chunk))
+            self._bump_version(subject)
+
+    def cached_count(self, subject, version):
+        key = (subject, "count")
+        count = self.cache.get(key, version)
+        if count is None:
+            count = self.count(subject)
+            self.cache.put(key, version, count, 64)
+        return count
+
+    def page(self, subject, page_no, version, after_id=None):
+        """Return page page_no of a subject as (ids, CompactQuestions), via the cache.
+
+        after_id, the last id of the previous page, allows a keyset read;
+        without it the page is located by offset.
+        """
+        key = (subject, page_no)
+        page = self.cache.get(key, version)
+        if page is None:
+            if after_id is not None:
+                rows = self.fetch_page(subject, after_id)
+            else:
+                rows = self.fetch_page_at(subject, page_no * self.page_size)
+            page = (array("q", [row_id for row_id, _ in rows]), CompactQuestions(row for _, row in rows))
+            self.cache.put(key, version, page, estimate_page_size(page))
+        return page
+
+    def fetch_page(self, subject, after_id=0, limit=None):
+        """Return up to limit (id, question_row) pairs with id > after_id.
+
+        Keyset paging walks the subject index directly, so page k costs the
+        same as page 0 however deep into the bank it is.
+        """
+        rows = self.conn.execute(
+            "SELECT id, question, option_a, option_b, option_c, option_d, correct_answer "
+            "FROM quizzes WHERE subject = ? AND id > ? ORDER BY id LIMIT ?",
+            (subject, after_id, limit or self.page_size)).fetchall()
+        return [(row[0], list(row[1:])) for row in rows]
+
+    def fetch_page_at(self, subject, offset, limit=None):
+        """Offset-based fallback for jumping to a page that was never walked to"""
+        rows = self.conn.execute(
+            "SELECT id, question, option_a, option_b, option_c, option_d, correct_answer "
+            "FROM quizzes WHERE subject = ? ORDER BY id LIMIT ? OFFSET ?",
+            (subject, limit or self.page_size, offset)).fetchall()
+        return [(row[0], list(row[1:])) for row in rows]
+
+    def add_question(self, subject, row):
+        with self.conn:
+            self._prepare_duplicates(subject)
+            cursor = self.conn.execute(
+                "INSERT INTO quizzes (subject, question, option_a, option_b, option_c, option_d, correct_answer) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (subject, *row))
+            self.duplicates.add_many(subject, [(cursor.lastrowid, question_fingerprint(row[0]))])
+            self._bump_version(subject)
+
+    def import_csv(self, subject, file_path, replace=True, batch_size=IMPORT_BATCH_SIZE, progress=None):
+        """Stream a question CSV into the table in one transaction.
+
+        With replace the subject's existing questions are swapped out
+        atomically, matching the old behaviour of overwriting the subject
+        file. Returns an ImportReport.
+
+        Rows whose question text duplicates one already in the subject (or
+        earlier in the file) are skipped; near-duplicates are imported but
+        listed on the report for review.
+        """
+        report = ImportReport()
+        pending = []
+
+        def flush():
+            # Rows are checked against the index a batch at a time, then against
+            # the earlier rows of their own batch, which are not indexed yet
+            fingerprints = [question_fingerprint(row[0]) for row in pending]
+            matches = self.duplicates.find_many(subject, fingerprints)
+            batch = []
+            kept = []
+            batch_hashes = set()
+            batch_bands = {}
+            for row, fingerprint, match in zip(pending, fingerprints, matches):
+                if fingerprint[0] in batch_hashes or (match is not None and match[1] == 1.0):
+                    report.skipped += 1
+                    continue
+                similarity = match[1] if match else 0.0
+                for i in {i for band_key in fingerprint[1] for i in batch_bands.get(band_key, ())}:
+                    candidate = jaccard(fingerprint[2], kept[i][2])
+                    if candidate > similarity:
+                        similarity = candidate
+                if similarity >= NEAR_DUPLICATE_THRESHOLD:
+                    report.flag_near_duplicate(row[0], similarity)
+                for band_key in fingerprint[1]:
+                    members = batch_bands.setdefault(band_key, [])
+                    if len(members) < LSH_BAND_CANDIDATES:
+                        members.append(len(kept))
+                batch_hashes.add(fingerprint[0])
+                kept.append(fingerprint)
+                batch.append((subject, *row))
+            pending.clear()
+            if not batch:
+                return
+
+            self.conn.executemany(
+                "INSERT INTO quizzes (subject, question, option_a, option_b, option_c, option_d, correct_answer) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            # Rows inserted by one executemany get consecutive ids ending at the sequence value
+            last_id = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'quizzes'").fetchone()[0]
+            first_id = last_id - len(batch) + 1
+            self.duplicates.add_many(subject, [(first_id + i, fingerprint) for i, fingerprint in enumerate(kept)])
+            report.imported += len(batch)
+
+        with self.conn:
+            if replace:
+                self.conn.execute("DELETE FROM quizzes WHERE subject = ?", (subject,))
+                self.duplicates.clear(subject)
+            else:
+                self._prepare_duplicates(subject)
+            for row in stream_csv(file_path, validate_question_row, report, progress, columns=QUESTION_COLUMNS):
+                pending.append(row)
+                if len(pending) >= batch_size:
+                    flush()
+            flush()
+            self._bump_version(subject)
+        report.finish()
+        return report
+
+    def id_runs(self, subject):
+        """The subject's question ids as runs of consecutive ids.
+
+        Returns (first_ordinals, first_ids, total) where run k covers
+        questions first_ordinals[k].. with ids first_ids[k]... The runs live
+        in question_sample_index, stamped with the bank version they were
+        built at, and are rebuilt the first time they are used after the
+        bank changes. Bulk imports produce one run each, so the index stays
+        a handful of rows even for millions of questions.
+        """
+        version = self.version(subject)
+        key = (subject, "runs")
+        runs = self.cache.get(key, version)
+        if runs is not None:
+            return runs
+
+        built = self.conn.execute(
+            "SELECT setting_value FROM settings WHERE setting_name = ?",
+            ("sample_index_version:" + subject,)).fetchone()
+        if built is None or int(built[0]) != version:
+            self.rebuild_sample_index(subject, version)
+
+        rows = self.conn.execute(
+            "SELECT first_ordinal, first_id, run_length FROM question_sample_index "
+            "WHERE subject = ? ORDER BY first_ordinal", (subject,)).fetchall()
+        total = rows[-1][0] + rows[-1][2] if rows else 0
+        runs = ([row[0] for row in rows], [row[1] for row in rows], total)
+        self.cache.put(key, version, runs, 64 + 72 * len(rows))
+        return runs
+
+    def rebuild_sample_index(self, subject, version):
+        # Consecutive ids share id - row_number(), which groups each run
+        runs = self.conn.execute(
+            "SELECT MIN(id), COUNT(*) FROM ("
+            "  SELECT id, id - ROW_NUMBER() OVER (ORDER BY id) AS run "
+            "  FROM quizzes WHERE subject = ?"
+            ") GROUP BY run ORDER BY MIN(id)", (subject,)).fetchall()
+        rows = []
+        ordinal = 0
+        for first_id, run_length in runs:
+            rows.append((subject, ordinal, first_id, run_length))
+            ordinal += run_length
+        with self.conn:
+            self.conn.execute("DELETE FROM question_sample_index WHERE subject = ?", (subject,))
+            self.conn.executemany("INSERT INTO question_sample_index VALUES (?, ?, ?, ?)", rows)
+            self.conn.execute(
+                "INSERT INTO settings (setting_name, setting_value) VALUES (?, ?) "
+                "ON CONFLICT(setting_name) DO UPDATE SET setting_value = excluded.setting_value",
+                ("sample_index_version:" + subject, str(version)))
+
+    def sample(self, subject, count, seed):
+        """Draw count distinct questions at random, reproducibly for a given seed.
+
+        Random ordinals are mapped to ids through the run index, so the cost
+        is count primary-key reads however large the bank is.
+        """
+        first_ordinals, first_ids, total = self.id_runs(subject)
+        ordinals = random.Random(seed).sample(range(total), min(count, total))
+        ids = []
+        for ordinal in ordinals:
+            run = bisect.bisect_right(first_ordinals, ordinal) - 1
+            ids.append(first_ids[run] + ordinal - first_ordinals[run])
+
+        rows = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for row in self.conn.execute(
+                    "SELECT id, question, option_a, option_b, option_c, option_d, correct_answer "
+                    f"FROM quizzes WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+                rows[row[0]] = row[1:]
+        return CompactQuestions(rows[question_id] for question_id in ids)
+
+    def import_legacy_file(self, subject):
+        """Copy a subject's legacy CSV into the table if the subject has no rows yet.
+
+        Returns False only when there is nothing in the table and no file.
+        """
+        if self.cached_count(subject, self.version(subject)):
+            return True
+        file_name = self.catalog.legacy_file(subject)
+        if not file_name or not os.path.exists(file_name):
+            return False
+        self.import_csv(subject, file_name, replace=False)
+        return True
+
+    def prepare(self, subject):
+        """Do the slow part of opening a subject, ahead of a quiz on another connection.
+
+        Imports the legacy file if needed, compiles a current pack and brings
+        the sample index up to date, so that questions() and sample() only map
+        the pack and probe the index. Returns False if the subject has no
+        questions anywhere.
+        """
+        if not self.import_legacy_file(subject) or not self.count(subject):
+            return False
+        if self.open_pack(subject) is None:
+            self.build_pack(subject)
+        self.id_runs(subject)
+        return True
+
+    def questions(self, subject):
+        """The subject's questions: its compiled pack if still current, else paged from the table"""
+        pack = self.open_pack(subject)
+        return pack if pack is not None else PagedQuestions(self, subject)
+
+    def pack_path(self, subject, version=None):
+        """File of the subject's pack for a bank version, by default the current one.
+
+        Each version gets its own file, so a rebuild never has to replace a
+        file that a session may still have mapped, which Windows refuses.
+        The subject is hashed rather than slugged so names like "C" and "C++"
+        cannot collide.
+        """
+        if version is None:
+            version = self.version(subject)
+        return os.path.join(self.pack_dir(), f"{self.pack_prefix(subject)}{version}.qpack")
+
+    def pack_dir(self):
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_path)), PACK_DIR)
+
+    @staticmethod
+    def pack_prefix(subject):
+        return hashlib.blake2b(subject.encode("utf-8"), digest_size=8).hexdigest() + "-"
+
+    def remove_old_packs(self, subject, keep):
+        """Delete the subject's other pack files; ones still mapped elsewhere are left for next time"""
+        prefix = self.pack_prefix(subject)
+        for name in os.listdir(self.pack_dir()):
+            path = os.path.join(self.pack_dir(), name)
+            if name.startswith(prefix) and name.endswith(".qpack") and path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def open_pack(self, subject):
+        """Map the subject's pack, or return None if there is none or it is stale or unreadable.
+
+        A pack is current only if its bank version and checksum are the ones
+        recorded when this database built it, which also rules out packs
+        copied in from another database.
+        """
+        row = self.conn.execute(
+            "SELECT setting_value FROM settings WHERE setting_name = ?", ("pack:" + subject,)).fetchone()
+        expected = f"{self.version(subject)}:"
+        if row is None or not row[0].startswith(expected):
+            return None
+        crc = int(row[0][len(expected):])
+        path = self.pack_path(subject, int(expected[:-1]))
+        pack = self.packs.get(subject)
+        if pack is not None and pack.crc == crc and pack.path == path:
+            return pack
+        try:
+            pack = QuestionPack(path)
+        except (OSError, ValueError, struct.error):
+            # A truncated or corrupt file; the table is read instead until the pack is rebuilt
+            return None
+        if pack.crc != crc or pack.subject != subject:
+            pack.close()
+            return None
+        # An older pack is unmapped once the last session reading it lets go
+        self.packs[subject] = pack
+        return pack
+
+    def build_pack(self, subject, path=None):
+        """Compile the subject's questions into a pack stamped with the current bank version"""
+
+        def rows():
+            after_id = 0
+            while True:
+                page = self.fetch_page(subject, after_id, IMPORT_BATCH_SIZE)
+                if not page:
+                    return
+                for _, row in page:
+                    yield row
+                after_id = page[-1][0]
+
+        with self.conn:
+            # One read snapshot for the version and every row; recording the
+            # pack fails if the subject was written to in the meantime
+            self.conn.execute("BEGIN")
+            version = self.version(subject)
+            own_path = self.pack_path(subject, version)
+            path = path or own_path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            current = self.packs.get(subject)
+            if current is not None and current.path == path:
+                # Rebuilding this version: unmap it so the file can be replaced
+                del self.packs[subject]
+                current.close()
+            count = write_question_pack(path, subject, rows(), version)
+            if path == own_path:
+                pack = QuestionPack(path)
+                self.conn.execute(
+                    "INSERT INTO settings (setting_name, setting_value) VALUES (?, ?) "
+                    "ON CONFLICT(setting_name) DO UPDATE SET setting_value = excluded.setting_value",
+                    ("pack:" + subject, f"{version}:{pack.crc}"))
+                self.packs[subject] = pack
+        if path == own_path:
+            self.remove_old_packs(subject, path)
+        return count
+
+
+class PagedQuestions:
+    """Read-only sequence over one subject's questions, loaded a page at a time.
+
+    Supports len(), indexing and iteration like the old list of CSV rows,
+    but holds at most two pages in memory: the one with the current question
+    and the one after it.
+    """
+
+    def __init__(self, bank, subject):
+        self.bank = bank
+        self.subject = subject
+        self.page_size = bank.page_size
+        self.version = bank.version(subject)
+        self.length = bank.cached_count(subject, self.version)
+        self.pages = {}
+        # Last question id of each page seen so far, for keyset paging
+        self.page_end_ids = {-1: 0}
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return self.length > 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("question index out of range")
+        page_no, offset = divmod(index, self.page_size)
+        return self._page(page_no)[offset]
+
+    def __iter__(self):
+        for _, questions in self._walk():
+            yield from questions
+
+    def _walk(self):
+        after_id = 0
+        for page_no in range((self.length + self.page_size - 1) // self.page_size):
+            ids, questions = self.bank.page(self.subject, page_no, self.version, after_id)
+            if not ids:
+                return
+            yield ids, questions
+            after_id = ids[-1]
+
+    def answer_key(self):
+        """Correct answers of the whole subject as ANSWER_CODES bytes"""
+        return b"".join(questions.answer_key() for _, questions in self._walk())
+
+    def _page(self, page_no):
+        page = self.pages.get(page_no)
+        if page is not None:
+            return page
+
+        ids, page = self.bank.page(self.subject, page_no, self.version, self.page_end_ids.get(page_no - 1))
+        if ids:
+            self.page_end_ids[page_no] = ids[-1]
+
+        # Keep only this page and its successor
+        for stale in [p for p in self.pages if p not in (page_no, page_no + 1)]:
+            del self.pages[stale]
+        self.pages[page_no] = page
+        return page
+
+
+def write_question_pack(path, subject, rows, bank_version=0):
+    """Write question rows to a pack file and return the number written.
+
+    Layout: header, subject name, UTF-8 string heap, offset table with one
+    uint64 per string plus an end offset, then one answer code per
+    question. The crc32 in the header covers everything after it. The file
+    is written next to its destination and renamed into place, so readers
+    never see a half-written pack.
+    """
+    subject_bytes = subject.encode("utf-8")
+    heap_offset = PACK_HEADER.size + len(subject_bytes)
+    offsets = array("Q")
+    answers = bytearray()
+    position = 0
+    crc = zlib.crc32(subject_bytes)
+    # Unique, so builders racing for the same pack never share a temp file
+    temp_path = f"{path}.{secrets.token_hex(4)}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(bytes(heap_offset))
+        chunk = []
+        for row in rows:
+            for text in row[:5]:
+                data = text.encode("utf-8")
+                offsets.append(position)
+                position += len(data)
+                chunk.append(data)
+            answers.append(ANSWER_CODES[row[5]])
+            if len(chunk) >= 5 * IMPORT_BATCH_SIZE:
+                data = b"".join(chunk)
+                crc = zlib.crc32(data, crc)
+                file.write(data)
+                chunk.clear()
+        data = b"".join(chunk)
+        offsets.append(position)
+
+        # Pad the heap so the offset table is 8-byte aligned
+        padding = bytes(-(heap_offset + position) % 8)
+        table_offset = heap_offset + position + len(padding)
+        for data in (data, padding, offsets.tobytes(), bytes(answers)):
+            crc = zlib.crc32(data, crc)
+            file.write(data)
+        file.seek(0)
+        file.write(PACK_HEADER.pack(PACK_MAGIC, PACK_FORMAT, len(subject_bytes), len(answers),
+                                    bank_version, table_offset, heap_offset, crc))
+        file.write(subject_bytes)
+    os.replace(temp_path, path)
+    return len(answers)
+
+
+class QuestionPack:
+    """Read-only, memory-mapped view of a compiled question pack.
+
+    Opening a pack reads only the header, so load time and memory do not
+    depend on the size of the bank; question i is decoded straight from
+    the mapping when it is indexed. Supports the same len(), indexing,
+    iteration and answer_key() as PagedQuestions.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, pack_format, subject_length, self.count, self.bank_version,
+             table_offset, self.heap_offset, self.crc) = PACK_HEADER.unpack_from(self.map)
+            if magic != PACK_MAGIC or pack_format != PACK_FORMAT:
+                raise ValueError(f"{path} is not a version {PACK_FORMAT} question pack")
+            self.subject = self.map[PACK_HEADER.size:self.heap_offset].decode("utf-8")
+            table_end = table_offset + 8 * (5 * self.count + 1)
+            if table_end + self.count != len(self.map) or PACK_HEADER.size + subject_length != self.heap_offset:
+                raise ValueError(f"{path} is truncated or corrupt")
+            self.view = memoryview(self.map)
+            self.offsets = self.view[table_offset:table_end].cast("Q")
+            self.answers = self.view[table_end:]
+        except Exception:
+            self.map.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("question index out of range")
+        base = self.heap_offset
+        offsets = self.offsets[5 * index:5 * index + 6]
+        fields = [str(self.view[base + start:base + end], "utf-8") for start, end in zip(offsets, offsets[1:])]
+        fields.append(ANSWER_LETTERS[self.answers[index]])
+        return tuple(fields)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def answer_key(self):
+        return bytes(self.answers)
+
+    def verify(self):
+        """True if the checksum in the header matches the contents"""
+        return zlib.crc32(self.view[PACK_HEADER.size:]) == self.crc
+
+    def close(self):
+        self.offsets.release()
+        self.answers.release()
+        self.view.release()
+        self.map.close()
+
+
+def csv_to_pack(csv_path, pack_path, subject=None):
+    """Compile a question CSV into a pack; returns the ImportReport of the rows read"""
+    report = ImportReport()
+    subject = subject or os.path.splitext(os.path.basename(csv_path))[0]
+    report.imported = write_question_pack(pack_path, subject, stream_csv(csv_path, validate_question_row, report, columns=QUESTION_COLUMNS))
+    report.finish()
+    return report
+
+
+def pack_to_csv(pack_path, csv_path):
+    """Write a pack back out as a question CSV; returns the number of rows"""
+    pack = QuestionPack(pack_path)
+    try:
+        if not pack.verify():
+            raise ValueError(f"{pack_path} fails its checksum")
+        with open(csv_path, "w", newline="", encoding="utf-8") as file:
+            csv.writer(file).writerows(pack)
+        return len(pack)
+    finally:
+        pack.close()
+
+
+class ResultStore:
+    """Quiz submissions in quiz_results with running per-user and per-subject stats.
+
+    An insert trigger keeps user_subject_stats and subject_stats current, so
+    reading a student's performance is one primary-key range scan no matter
+    how many results have been stored.
+    """
+
+    def __init__(self, db_path=DB_FILE):
+        self.db_path = db_path
+        self.conn = connect_db(db_path)
+        self.rebuild_stats_if_missing()
+
+    def record(self, user_id, subject, score, total_questions):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO quiz_results (user_id, subject, score, total_questions) VALUES (?, ?, ?, ?)",
+                (user_id, subject, score, total_questions))
+
+    def user_stats(self, user_id):
+        """Return [(subject, attempts, mean %, best %, last %)] for one student"""
+        return self.conn.execute(
+            "SELECT subject, attempts, percent_total / attempts, best_percent, last_percent "
+            "FROM user_subject_stats WHERE user_id = ? ORDER BY subject", (user_id,)).fetchall()
+
+    def subject_stats(self, subject):
+        """Return (attempts, mean %, best %, last %) over all students, or None"""
+        return self.conn.execute(
+            "SELECT attempts, percent_total / attempts, best_percent, last_percent "
+            "FROM subject_stats WHERE subject = ?", (subject,)).fetchone()
+
+    def rebuild_stats_if_missing(self):
+        """Backfill the stats tables for results stored before the trigger existed"""
+        has_results = self.conn.execute("SELECT 1 FROM quiz_results LIMIT 1").fetchone()
+        has_stats = self.conn.execute("SELECT 1 FROM subject_stats LIMIT 1").fetchone()
+        if has_results and not has_stats:
+            self.rebuild_stats()
+
+    def rebuild_stats(self):
+        percent = "100.0 * score / MAX(total_questions, 1)"
+        last = (f"(SELECT {percent} FROM quiz_results AS latest WHERE latest.user_id = r.user_id "
+                f"AND latest.subject = r.subject ORDER BY latest.id DESC LIMIT 1)")
+        with self.conn:
+            self.conn.execute("DELETE FROM user_subject_stats")
+            self.conn.execute("DELETE FROM subject_stats")
+            self.conn.execute(
+                f"INSERT INTO user_subject_stats SELECT user_id, subject, COUNT(*), SUM({percent}), "
+                f"MAX({percent}), {last}, MAX(completed_at) FROM quiz_results AS r GROUP BY user_id, subject")
+            self.conn.execute(
+                f"INSERT INTO subject_stats SELECT subject, COUNT(*), SUM({percent}), MAX({percent}), "
+                f"(SELECT {percent} FROM quiz_results AS latest WHERE latest.subject = r.subject "
+                f"ORDER BY latest.id DESC LIMIT 1), MAX(completed_at) FROM quiz_results AS r GROUP BY subject")
+
+
+class CompletionIndex:
+    """Which students have completed which subjects, keyed by (user_id, subject).
+
+    Rows are added by a trigger on quiz_results, so every way of storing a
+    result also marks the quiz as taken.
+    """
+
+    # user_id for entries from the old log, which did not record who took the quiz
+    UNKNOWN_USER = 0
+
+    def __init__(self, db_path=DB_FILE):
+        self.db_path = db_path
+        self.conn = connect_db(db_path)
+        self.compact_legacy_log()
+
+    def is_completed(self, user_id, subject):
+        return self.conn.execute(
+            "SELECT 1 FROM completed_quizzes WHERE user_id = ? AND subject = ?",
+            (user_id, subject)).fetchone() is not None
+
+    def completed_subjects(self, user_id):
+        return {row[0] for row in self.conn.execute(
+            "SELECT subject FROM completed_quizzes WHERE user_id = ?", (user_id,))}
+
+    def compact_legacy_log(self, log_path=COMPLETED_FILE):
+        """One-time fold of completed_quizzes.txt into the table.
+
+        The log has one subject per line and no username, so its entries are
+        kept under UNKNOWN_USER and block nobody. The file is then renamed to
+        <name>.migrated so later starts skip it.
+        """
+        if not os.path.exists(log_path):
+            return 0
+        with open(log_path, "r") as file:
+            subjects = {line.strip() for line in file if line.strip()}
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO completed_quizzes (user_id, subject) VALUES (?, ?)",
+                [(self.UNKNOWN_USER, subject) for subject in subjects])
+        os.replace(log_path, log_path + ".migrated")
+        return len(subjects)
+
+
+class ResultWriter:
+    """Background thread that stores quiz results with group commit.
+
+    record() has the same signature as ResultStore.record but only queues
+    the row and returns a Future that resolves once it is committed. The
+    writer drains everything queued while the previous commit ran and
+    writes it in one transaction, so a burst of submissions costs a few
+    commits instead of one each. Busy/locked errors are retried with
+    backoff.
+    """
+
+    def __init__(self, db_path=DB_FILE, max_batch=1000, max_retries=8):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.queue = queue.Queue()
+        self.commits = 0
+        self.rows = 0
+        self.retries = 0
+        self.thread = threading.Thread(target=self.run, name="result-writer", daemon=True)
+        self.thread.start()
+
+    def record(self, user_id, subject, score, total_questions):
+        future = Future()
+        self.queue.put(((user_id, subject, score, total_questions), future))
+        return future
+
+    def close(self):
+        """Flush queued results and stop the writer thread"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        conn = connect_db(self.db_path)
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.write(conn, batch)
+        conn.close()
+
+    def write(self, conn, batch):
+        rows = [row for row, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO quiz_results (user_id, subject, score, total_questions) VALUES (?, ?, ?, ?)",
+                        rows)
+                break
+            except sqlite3.OperationalError as e:
+                busy = "locked" in str(e) or "busy" in str(e)
+                if not busy or attempt == self.max_retries:
+                    self.fail(batch, e)
+                    return
+                self.retries += 1
+                time.sleep(0.005 * 2 ** attempt)
+            except Exception as e:
+                # Anything else fails this batch only; the writer keeps serving later ones
+                self.fail(batch, e)
+                return
+        self.commits += 1
+        self.rows += len(batch)
+        for _, future in batch:
+            future.set_result(True)
+
+    @staticmethod
+    def fail(batch, error):
+        for _, future in batch:
+            future.set_exception(error)
+
+
+class CountdownTicker:
+    """One after() chain that drives every on-screen countdown.
+
+    Each countdown is a monotonic deadline, so a late wakeup under a busy
+    event loop shows the right time instead of drifting. The ticker sleeps
+    until the soonest displayed second rolls over, keeps a single pending
+    after-id that cancel() really cancels, and schedules nothing while no
+    countdown is running.
+    """
+
+    def __init__(self, root, now=time.monotonic):
+        self.root = root
+        self.now = now
+        self.countdowns = {}
+        self.next_handle = 0
+        self.after_id = None
+        self.wakeups = 0
+        self.cpu_seconds = 0.0
+
+    def add(self, deadline, on_tick, on_expire):
+        """Start a countdown; on_tick(seconds_left) runs on every displayed second"""
+        self.next_handle += 1
+        self.countdowns[self.next_handle] = (deadline, on_tick, on_expire)
+        on_tick(max(0, math.ceil(deadline - self.now())))
+        self.reschedule()
+        return self.next_handle
+
+    def cancel(self, handle):
+        self.countdowns.pop(handle, None)
+        if not self.countdowns:
+            self.reschedule()
+
+    def tick(self):
+        self.after_id = None
+        self.wakeups += 1
+        started = time.process_time()
+        now = self.now()
+        for handle, (deadline, on_tick, on_expire) in list(self.countdowns.items()):
+            if handle not in self.countdowns:
+                continue  # cancelled by an earlier callback in this tick
+            left = deadline - now
+            if left <= 0:
+                del self.countdowns[handle]
+                on_tick(0)
+                on_expire()
+            else:
+                on_tick(math.ceil(left))
+        self.cpu_seconds += time.process_time() - started
+        self.reschedule()
+
+    def reschedule(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        if not self.countdowns:
+            return
+        now = self.now()
+        # Sleep until the first displayed value changes, i.e. a deadline crosses a whole second
+        delays = []
+        for deadline, _, _ in self.countdowns.values():
+            left = deadline - now
+            delays.append(left % 1.0 or 1.0 if left > 0 else 0.0)
+        self.after_id = self.root.after(int(min(delays) * 1000) + 1, self.tick)
+
+
+class JobCancelled(Exception):
+    """Raised inside a background job once the user has cancelled it"""
+
+
+class Job:
+    """One BackgroundJobs task, shared by its worker and the Tk thread"""
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self.future = None
+        # Latest progress, written by the worker and read by the Tk poll
+        self.fraction = 0.0
+        self.rows = 0
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self, fraction, rows):
+        """progress callback for the import_csv methods; aborts the job once cancelled"""
+        if self.cancelled.is_set():
+            raise JobCancelled()
+        self.fraction, self.rows = fraction, rows
+
+
+class BackgroundJobs:
+    """Thread pool for the UI's file and database work, with results back through after().
+
+    Tk is only touched from the mainloop, so workers never call back into
+    it: the Tk thread polls each job every JOB_POLL_MS, passes on its
+    latest progress and runs done(result) or failed(error) once it ends.
+    An sqlite3 connection belongs to the thread that opened it, so each
+    worker has its own UserStore and QuestionBank, handed to every job it
+    runs. A cancelled job's result is dropped; imports also roll back,
+    because Job.progress raises inside their transaction.
+    """
+
+    def __init__(self, root, db_path=DB_FILE, iterations=PASSWORD_ITERATIONS, workers=DATA_WORKERS):
+        self.root = root
+        self.db_path = db_path
+        self.iterations = iterations
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="data")
+        self.local = threading.local()
+        # Jobs whose results have not been delivered yet
+        self.pending = 0
+
+    def stores(self):
+        """The calling worker's own stores, opened on first use"""
+        local = self.local
+        if not hasattr(local, "question_bank"):
+            local.user_store = UserStore(self.db_path, self.iterations)
+            local.question_bank = QuestionBank(self.db_path)
+        return local
+
+    def submit(self, work, done, failed=None, progress=None):
+        """Run work(stores, job) on a worker and return the Job.
+
+        done(result), failed(error) and progress(fraction, rows) all run on
+        the Tk thread; without failed, errors are shown in a message box.
+        """
+        job = Job()
+        job.future = self.pool.submit(lambda: work(self.stores(), job))
+        self.pending += 1
+        self.root.after(JOB_POLL_MS, self.poll, job, done, failed, progress)
+        return job
+
+    def poll(self, job, done, failed, progress):
+        if not job.future.done():
+            if progress is not None and not job.cancelled.is_set():
+                progress(job.fraction, job.rows)
+            self.root.after(JOB_POLL_MS, self.poll, job, done, failed, progress)
+            return
+        self.pending -= 1
+        if job.cancelled.is_set():
+            return
+        try:
+            result = job.future.result()
+        except Exception as e:
+            if failed is None:
+                messagebox.showerror("Error", str(e))
+            else:
+                failed(e)
+            return
+        done(result)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+class QuizError(Exception):
+    """A quiz step that cannot go ahead; the message is meant for the student"""
+
+
+class QuizSession:
+    """One student's attempt at a quiz, with no dependency on Tk.
+
+    Drives the start -> next_question -> submit lifecycle. QuizApp renders a
+    session; the load-test harness and the server drive sessions directly.
+    """
+
+    def __init__(self, question_bank, result_store=None, user=None):
+        self.question_bank = question_bank
+        self.result_store = result_store
+        self.user = user
+        self.subject = None
+        self.questions = CompactQuestions()
+        self.selected_answers = []
+        self.current_question_index = 0
+        self.time_limit = 0
+        self.deadline = None
+        self.score_result = None
+        # Future from a ResultWriter until the result is committed
+        self.pending_write = None
+
+    @METRICS.timed("load_questions")
+    def load_questions(self, subject):
+        if not self.question_bank.catalog.exists(subject):
+            raise QuizError("Invalid subject selected.")
+        if not self.question_bank.import_legacy_file(subject):
+            raise QuizError(f"Quiz file for {subject} not found.")
+        questions = self.question_bank.questions(subject)
+        if not questions:
+            raise QuizError("No questions found in the quiz file.")
+        self.questions = questions
+
+    def start(self, subject, time_limit=DEFAULT_QUIZ_SECONDS, sample_size=0, seed=None):
+        """Begin an attempt; with sample_size, draw that many questions using seed"""
+        self.load_questions(subject)
+        if 0 < sample_size < len(self.questions):
+            self.questions = self.question_bank.sample(subject, sample_size, seed)
+        self.subject = subject
+        self.selected_answers = []
+        self.current_question_index = 0
+        self.time_limit = time_limit
+        # Remaining time is always derived from this, so it cannot drift
+        self.deadline = time.monotonic() + time_limit
+        self.score_result = None
+
+    @property
+    def finished(self):
+        return self.current_question_index >= len(self.questions)
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining_seconds(self):
+        """Whole seconds left, rounded up as a countdown shows them"""
+        if self.deadline is None:
+            return 0
+        return max(0, math.ceil(self.deadline - time.monotonic()))
+
+    @property
+    def on_last_question(self):
+        return self.current_question_index == len(self.questions) - 1
+
+    def current_question(self):
+        """The question being answered, or None once every question is answered"""
+        if self.finished:
+            return None
+        return self.questions[self.current_question_index]
+
+    def next_question(self, answer):
+        """Record the answer to the current question; returns True while questions remain"""
+        if self.score_result is not None:
+            raise QuizError("The quiz has already been submitted.")
+        if not answer:
+            raise QuizError("Please select an answer.")
+        if self.finished:
+            raise QuizError("The quiz has no more questions.")
+        if self.expired:
+            raise QuizError("The time for the quiz has expired!")
+        self.selected_answers.append(answer)
+        self.current_question_index += 1
+        return not self.finished
+
+    def submit(self):
+        """Grade the attempt and store the result; repeated calls return the same result"""
+        if self.score_result is None:
+            engine = ScoringEngine(self.questions.answer_key())
+            self.score_result = engine.score(self.selected_answers)
+            if self.result_store is not None and self.user is not None:
+                self.pending_write = self.result_store.record(
+                    self.user["id"], self.subject, self.score_result.score, self.score_result.total)
+        return self.score_result
+
+
+class SettingsStore:
+    """Cached, typed access to the settings table with change notifications.
+
+    All settings are read once and served from memory. Another process's
+    commit is noticed through PRAGMA data_version, which costs no file I/O,
+    and the cache is reloaded then. set() notifies callbacks registered with
+    subscribe(), so open screens update without re-reading anything.
+    """
+
+    THEMES = ("light", "dark")
+
+    def __init__(self, db_path=DB_FILE):
+        self.db_path = db_path
+        self.conn = connect_db(db_path)
+        self.listeners = {}
+        self.migrate_legacy_files()
+        self.reload()
+
+    def reload(self):
+        self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        self.values = dict(self.conn.execute("SELECT setting_name, setting_value FROM settings"))
+
+    def get(self, name, default=None):
+        if self.conn.execute("PRAGMA data_version").fetchone()[0] != self.data_version:
+            self.reload()
+        return self.values.get(name, default)
+
+    def get_int(self, name, default):
+        try:
+            return int(self.get(name, default))
+        except (TypeError, ValueError):
+            return default
+
+    def set(self, name, value):
+        value = str(value)
+        if self.get(name) == value:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO settings (setting_name, setting_value) VALUES (?, ?) "
+                "ON CONFLICT(setting_name) DO UPDATE SET setting_value = excluded.setting_value",
+                (name, value))
+        self.values[name] = value
+        for callback in list(self.listeners.get(name, ())):
+            callback(value)
+
+    def subscribe(self, name, callback):
+        """Call callback(new_value) whenever set() changes name"""
+        self.listeners.setdefault(name, []).append(callback)
+
+    def unsubscribe(self, name, callback):
+        if callback in self.listeners.get(name, ()):
+            self.listeners[name].remove(callback)
+
+    def quiz_seconds(self):
+        """Quiz duration configured by the admin, in seconds"""
+        seconds = self.get_int("quiz_seconds", DEFAULT_QUIZ_SECONDS)
+        return seconds if seconds > 0 else DEFAULT_QUIZ_SECONDS
+
+    def set_quiz_seconds(self, seconds):
+        self.set("quiz_seconds", int(seconds))
+
+    def password_iterations(self):
+        """PBKDF2 cost for new password hashes; older hashes are upgraded at login"""
+        return max(1, self.get_int("password_iterations", PASSWORD_ITERATIONS))
+
+    def set_password_iterations(self, iterations):
+        self.set("password_iterations", max(1, int(iterations)))
+
+    def exam_sample_size(self):
+        """Questions drawn per exam; 0 means the whole bank in order"""
+        return max(0, self.get_int("exam_sample_size", 0))
+
+    def set_exam_sample_size(self, count):
+        self.set("exam_sample_size", max(0, int(count)))
+
+    def theme(self):
+        theme = self.get("theme", "light")
+        return theme if theme in self.THEMES else "light"
+
+    def set_theme(self, theme):
+        self.set("theme", theme if theme in self.THEMES else "light")
+
+    def migrate_legacy_files(self):
+        """One-time copy of timer_settings.txt and theme_settings.txt into the table"""
+        done = self.conn.execute(
+            "SELECT 1 FROM settings WHERE setting_name = 'legacy_settings_migrated'").fetchone()
+        if done:
+            return
+        legacy = {"legacy_settings_migrated": "1"}
+        for name, file_name in (("quiz_seconds", TIMER_FILE), ("theme", THEME_FILE)):
+            try:
+                with open(file_name, "r") as f:
+                    value = f.read().strip()
+            except FileNotFoundError:
+                continue
+            if value:
+                legacy[name] = value
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO settings (setting_name, setting_value) VALUES (?, ?) "
+                "ON CONFLICT(setting_name) DO UPDATE SET setting_value = excluded.setting_value",
+                legacy.items())
+
+
+class QuizServer:
+    """Serves the login -> subject -> quiz -> submit flow to many students over HTTP.
+
+    A single asyncio process keeps each student's QuizSession in memory and
+    shares one QuestionBank, and so one question cache, between all of them.
+    Requests and responses are JSON; after login the client sends
+    "Authorization: Bearer <token>".
+
+        POST /login          {"username", "password"}  -> {"token", ...}
+        GET  /subjects                                  -> {"subjects": [...]}
+        POST /quiz/start     {"subject"}                -> first question
+        POST /quiz/answer    {"answer": "A".."D"}       -> next question
+        POST /quiz/submit                               -> {"score", "total", "correct"}
+        POST /logout
+    """
+
+    def __init__(self, db_path=DB_FILE, host="127.0.0.1", port=8080):
+        self.host = host
+        self.port = port
+        self.settings = SettingsStore(db_path)
+        self.user_store = UserStore(db_path, self.settings.password_iterations())
+        self.login_verifier = LoginVerifier(self.user_store.iterations)
+        self.question_bank = QuestionBank(db_path)
+        # Submissions from every student are group-committed off the event loop
+        self.result_writer = ResultWriter(db_path)
+        self.completion_index = CompletionIndex(db_path)
+        # Session tokens come from login_verifier and expire with it
+        self.sessions = {}
+        # user_id -> the QuizSession of an unsubmitted attempt, kept across logins
+        self.attempts = {}
+        self.last_sweep = time.monotonic()
+        self.server = None
+        self.routes = {
+            ("POST", "/login"): (self.handle_login, False),
+            ("GET", "/subjects"): (self.handle_subjects, False),
+            ("POST", "/quiz/start"): (self.handle_start, True),
+            ("POST", "/quiz/answer"): (self.handle_answer, True),
+            ("POST", "/quiz/submit"): (self.handle_submit, True),
+            ("POST", "/logout"): (self.handle_logout, True),
+        }
+
+    async def start(self):
+        import asyncio
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    def serve_forever(self):
+        import asyncio
+
+        async def run():
+            await self.start()
+            print(f"Quiz server listening on http://{self.host}:{self.port}")
+            async with self.server:
+                await self.server.serve_forever()
+        try:
+            asyncio.run(run())
+        finally:
+            self.result_writer.close()
+
+    async def handle_connection(self, reader, writer):
+        import asyncio
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, path.split("?", 1)[0], headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, headers, body):
+        from http import HTTPStatus
+        route = self.routes.get((method, path))
+        if route is None:
+            return HTTPStatus.NOT_FOUND, {"error": "Not found"}
+        handler, needs_session = route
+
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "Body must be JSON"}
+        if not isinstance(data, dict):
+            return HTTPStatus.BAD_REQUEST, {"error": "Body must be a JSON object"}
+
+        self.sweep_sessions()
+        args = [data]
+        if needs_session:
+            token = headers.get("authorization", "").removeprefix("Bearer ").strip()
+            session = self.sessions.get(token)
+            if session is None or self.login_verifier.user_for(token) is None:
+                self.sessions.pop(token, None)
+                return HTTPStatus.UNAUTHORIZED, {"error": "Please log in."}
+            args = [data, session, token]
+
+        try:
+            return HTTPStatus.OK, await handler(*args)
+        except QuizError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            print(f"{method} {path} failed: {e!r}", file=sys.stderr)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+
+    def sweep_sessions(self):
+        """Drop the sessions of expired tokens, at most every SESSION_SWEEP_SECONDS"""
+        if time.monotonic() - self.last_sweep < SESSION_SWEEP_SECONDS:
+            return
+        self.last_sweep = time.monotonic()
+        for token in self.login_verifier.purge():
+            self.sessions.pop(token, None)
+        # Attempts left to run out are graded as they stand, as the desktop does on timeout
+        for user_id, session in list(self.attempts.items()):
+            if session.expired:
+                del self.attempts[user_id]
+                session.submit()
+
+    @staticmethod
+    def question_payload(session):
+        question = session.current_question()
+        if question is None:
+            return {"finished": True, "total": len(session.questions)}
+        return {
+            "finished": False,
+            "index": session.current_question_index,
+            "total": len(session.questions),
+            "question": question[0],
+            "options": dict(zip(ANSWER_LETTERS, question[1:5])),
+            "last": session.on_last_question,
+            "remaining": session.remaining_seconds(),
+        }
+
+    async def handle_login(self, data):
+        username = str(data.get("username", "")).strip()
+        password = str(data.get("password", "")).strip()
+        if not username or not password:
+            raise QuizError("Please enter both username and password.")
+        import asyncio
+        row = self.user_store.lookup(username)
+        # PBKDF2 runs on the login pool, beside the event loop
+        user, upgrade = await asyncio.wrap_future(self.login_verifier.verify(row, username, password))
+        if user is None:
+            raise QuizError("Invalid Username or Password")
+        if upgrade is not None:
+            self.user_store.set_password_hash(user["id"], *upgrade)
+        token = self.login_verifier.issue(user)
+        # Logging in again picks up an unsubmitted attempt rather than allowing a fresh one
+        session = self.attempts.get(user["id"])
+        if session is None:
+            session = QuizSession(self.question_bank, self.result_writer, user)
+        self.sessions[token] = session
+        return {"token": token, "username": username, "is_admin": user["is_admin"]}
+
+    async def handle_subjects(self, data):
+        return {"subjects": self.question_bank.catalog.names()}
+
+    async def handle_start(self, data, session, token):
+        subject = str(data.get("subject", ""))
+        if session.subject is not None and session.score_result is None:
+            if session.subject != subject:
+                raise QuizError("Please submit the quiz in progress first.")
+            # A re-sent start resumes the attempt; restarting would reset the timer
+            payload = self.question_payload(session)
+            payload["time_limit"] = session.time_limit
+            return payload
+        if self.completion_index.is_completed(session.user["id"], subject):
+            raise QuizError("You have already completed this quiz.")
+        # Seeded by student and subject, so the paper is the same however often it is drawn
+        session.start(subject, self.settings.quiz_seconds(), self.settings.exam_sample_size(),
+                      f"{session.user['id']}:{subject}")
+        self.attempts[session.user["id"]] = session
+        payload = self.question_payload(session)
+        payload["time_limit"] = session.time_limit
+        return payload
+
+    async def handle_answer(self, data, session, token):
+        answer = str(data.get("answer", "")).strip().upper()
+        if answer and answer not in ANSWER_LETTERS:
+            raise QuizError(f"Answer must be one of {', '.join(ANSWER_LETTERS)}.")
+        session.next_question(answer)
+        return self.question_payload(session)
+
+    async def handle_submit(self, data, session, token):
+        if session.subject is None:
+            raise QuizError("No quiz in progress.")
+        import asyncio
+        result = session.submit()
+        self.attempts.pop(session.user["id"], None)
+        if session.pending_write is not None:
+            await asyncio.wrap_future(session.pending_write)
+        return {"score": result.score, "total": result.total,
+                "correct": [bool(ok) for ok in result.correct]}
+
+    async def handle_logout(self, data, session, token):
+        del self.sessions[token]
+        self.login_verifier.revoke(token)
+        return {"ok": True}
+
+
+class ImportReport:
+    """Counters for one streaming CSV import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.rejects = []
+        self.near_duplicates = 0
+        self.near_duplicate_examples = []
+        self.header_skipped = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def reject(self, line_no, reason):
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append((line_no, reason))
+
+    def flag_near_duplicate(self, text, similarity):
+        self.near_duplicates += 1
+        if len(self.near_duplicate_examples) < MAX_REPORTED_REJECTS:
+            self.near_duplicate_examples.append((text, similarity))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self):
+        rows = self.imported + self.skipped + self.rejected
+        return rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        lines = [f"Imported {self.imported} rows in {self.elapsed:.2f}s ({self.rows_per_sec:,.0f} rows/sec)."]
+        if self.header_skipped:
+            lines.append("Header row detected and skipped.")
+        if self.skipped:
+            lines.append(f"Skipped {self.skipped} rows that already existed.")
+        return "\n".join(lines + self.details())
+
+    def details(self):
+        """Lines listing rejected rows and near-duplicates"""
+        lines = []
+        if self.rejected:
+            lines.append(f"Rejected {self.rejected} invalid rows:")
+            lines.extend(f"  line {line_no}: {reason}" for line_no, reason in self.rejects)
+            if self.rejected > len(self.rejects):
+                lines.append(f"  ... and {self.rejected - len(self.rejects)} more")
+        if self.near_duplicates:
+            lines.append(f"Imported {self.near_duplicates} near-duplicates of existing questions:")
+            lines.extend(f"  {similarity:.0%} similar: {text[:60]}"
+                         for text, similarity in self.near_duplicate_examples)
+            if self.near_duplicates > len(self.near_duplicate_examples):
+                lines.append(f"  ... and {self.near_duplicates - len(self.near_duplicate_examples)} more")
+        return lines
+
+
+class RosterSyncReport(ImportReport):
+    """Counters for UserStore.sync_roster; imported counts new students"""
+
+    def __init__(self):
+        super().__init__()
+        self.updated = 0
+        self.reactivated = 0
+        self.unchanged = 0
+        self.deactivated = 0
+
+    @property
+    def rows_per_sec(self):
+        rows = self.imported + self.updated + self.reactivated + self.unchanged + self.skipped + self.rejected
+        return rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        lines = [f"Synced the roster in {self.elapsed:.2f}s ({self.rows_per_sec:,.0f} rows/sec).",
+                 f"Added {self.imported}, updated {self.updated}, reactivated {self.reactivated}, "
+                 f"deactivated {self.deactivated}; {self.unchanged} unchanged."]
+        if self.header_skipped:
+            lines.append("Header row detected and skipped.")
+        if self.skipped:
+            lines.append(f"Skipped {self.skipped} rows repeating a username or naming an admin.")
+        return "\n".join(lines + self.details())
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def validate_question_row(row):
+    """Return (clean_row, None) for a valid question row, else (None, reason)"""
+    if len(row) != 6:
+        return None, f"expected 6 columns, found {len(row)}"
+    question, option_a, option_b, option_c, option_d, answer = row
+    row = [question.strip(), option_a.strip(), option_b.strip(), option_c.strip(),
+           option_d.strip(), answer.strip().upper()]
+    if "" in row:
+        return None, "empty field"
+    if row[5] not in ANSWER_LETTERS:
+        return None, f"answer must be A-D, found '{row[5]}'"
+    return row, None
+
+
+# Column names of the header rows stream_csv skips; any other bad first row is rejected
+STUDENT_COLUMNS = ("username", "password")
+QUESTION_COLUMNS = ("question", "option_a", "option_b", "option_c", "option_d", "correct_answer")
+
+
+def validate_student_row(row):
+    """Return (clean_row, None) for a valid username,password row, else (None, reason)"""
+    if len(row) != 2:
+        return None, f"expected 2 columns, found {len(row)}"
+    row = [value.strip() for value in row]
+    if "" in row:
+        return None, "empty field"
+    return row, None
+
+
+def stream_csv(file_path, validate, report, progress=None, progress_every=IMPORT_BATCH_SIZE, columns=None):
+    """Yield validated rows from a CSV file without loading it into memory.
+
+    Blank lines are ignored. Given columns, a first row naming them
+    (ignoring case, with spaces read as underscores) is skipped as a header.
+    Rows that fail validation are recorded on the report.
+    progress(fraction, rows), when given, is called every progress_every rows
+    with an estimate of how much of the file has been read.
+    """
+    total_size = os.path.getsize(file_path) or 1
+    rows_seen = 0
+    with open(file_path, "r", newline="", encoding="utf-8-sig") as file:
+        reader = csv.reader(file)
+        for row in reader:
+            if not row or (len(row) == 1 and not row[0].strip()):
+                continue
+            rows_seen += 1
+            clean, reason = validate(row)
+            if rows_seen == 1 and columns and [
+                    value.strip().lower().replace(" ", "_") for value in row] == list(columns):
+                report.header_skipped = True
+            elif clean is not None:
+                yield clean
+            else:
+                report.reject(reader.line_num, reason)
+            if progress and rows_seen % progress_every == 0:
+                # The byte offset of the underlying buffer is exact to within one read chunk
+                progress(min(file.buffer.tell() / total_size, 1.0), rows_seen)
+    if progress:
+        progress(1.0, rows_seen)
+
+
+# Maps the ASCII letters A-D to codes 0-3 and every other byte to UNANSWERED
+ANSWER_TRANSLATION = bytes(ANSWER_CODES.get(chr(i), UNANSWERED) for i in range(256))
+
+
+def numpy_module():
+    """Import NumPy on first use; returns None when it is not installed"""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:  # scoring falls back to plain Python
+            _numpy = None
+    return _numpy
+
+
+def encode_answers(letters, length=None):
+    """Pack answer letters into bytes, one code per question.
+
+    letters may be a sequence of single letters or an already encoded
+    bytes object. Anything other than A-D, and any question past the end of
+    letters when length is given, is stored as UNANSWERED.
+    """
+    if isinstance(letters, bytes):
+        codes = letters
+    else:
+        joined = "".join(letters)
+        if len(joined) == len(letters) and joined.isascii():
+            # Fast path: every entry is one character, translate in C
+            codes = joined.encode("ascii").translate(ANSWER_TRANSLATION)
+        else:
+            codes = bytes(ANSWER_CODES.get(letter, UNANSWERED) for letter in letters)
+    if length is not None and len(codes) != length:
+        codes = codes[:length] + bytes([UNANSWERED]) * (length - len(codes))
+    return codes
+
+
+class ScoreResult:
+    """Score of one answer sheet plus its per-question correctness vector"""
+
+    def __init__(self, score, total, correct):
+        self.score = score
+        self.total = total
+        self.correct = correct
+
+    def wrong_indices(self):
+        if not isinstance(self.correct, list):
+            return numpy_module().flatnonzero(~self.correct).tolist()
+        return [i for i, ok in enumerate(self.correct) if not ok]
+
+
+class ScoringEngine:
+    """Grades answer sheets against an answer key held as a compact byte array.
+
+    With NumPy installed a whole cohort is graded in one vectorised
+    comparison; without it the same API works on plain bytes.
+    """
+
+    def __init__(self, answer_key):
+        self.key = encode_answers(answer_key)
+        self.total = len(self.key)
+        np = numpy_module()
+        self.key_array = np.frombuffer(self.key, dtype=np.uint8) if np is not None else None
+
+    def score(self, responses):
+        """Grade one sheet of answer letters, returning a ScoreResult"""
+        codes = encode_answers(responses, self.total)
+        np = numpy_module()
+        if np is not None:
+            correct = np.frombuffer(codes, dtype=np.uint8) == self.key_array
+            return ScoreResult(int(correct.sum()), self.total, correct)
+        correct = [a == b for a, b in zip(codes, self.key)]
+        return ScoreResult(sum(correct), self.total, correct)
+
+    def score_batch(self, sheets):
+        """Grade many sheets in one call.
+
+        Returns (scores, correct) where scores[i] is the score of sheet i and
+        correct[i][j] says whether sheet i answered question j correctly.
+        With NumPy these are a uint32 vector and a boolean matrix.
+        """
+        encoded = b"".join(encode_answers(sheet, self.total) for sheet in sheets)
+        np = numpy_module()
+        if np is not None:
+            matrix = np.frombuffer(encoded, dtype=np.uint8).reshape(-1, self.total)
+            correct = matrix == self.key_array
+            return correct.sum(axis=1, dtype=np.uint32), correct
+        correct = []
+        for start in range(0, len(encoded), self.total or 1):
+            sheet = encoded[start:start + self.total]
+            correct.append([a == b for a, b in zip(sheet, self.key)])
+        return [sum(row) for row in correct], correct
+
+
+class ReviewList:
+    """Virtualized, scrollable list of answered questions for the review screen.
+
+    Only as many row widgets as fit in the viewport are created. Scrolling
+    re-binds those rows to other questions, so the widget count and render
+    time do not depend on the length of the quiz. Each row is as tall as its
+    wrapped question needs, so rows are stacked after they are filled in.
+    """
+
+    def __init__(self, parent, questions, selected_answers, score_result=None):
+        self.questions = questions
+        self.selected_answers = selected_answers
+        # Correctness computed at submit time is reused rather than re-derived
+        self.score_result = score_result
+        self.indices = range(len(questions))
+        self.top = 0
+        self.rows = []
+        # Rows fully on screen after the last refresh
+        self.shown = 1
+
+        self.frame = ttk.Frame(parent)
+        self.viewport = ttk.Frame(self.frame)
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.viewport.bind("<Configure>", self.on_resize)
+        self.bind_wheel(self.viewport)
+
+    def answer_at(self, index):
+        return self.selected_answers[index] if index < len(self.selected_answers) else "-"
+
+    def is_correct(self, index):
+        if self.score_result is not None:
+            return bool(self.score_result.correct[index])
+        return self.answer_at(index) == self.questions[index][5]
+
+    def show_only_wrong(self, only_wrong):
+        if only_wrong and self.score_result is not None:
+            self.indices = self.score_result.wrong_indices()
+        elif only_wrong:
+            self.indices = [i for i in range(len(self.questions)) if not self.is_correct(i)]
+        else:
+            self.indices = range(len(self.questions))
+        self.top = 0
+        self.refresh()
+
+    def visible_count(self):
+        """The most rows that can be on screen at once"""
+        return max(1, self.viewport.winfo_height() // REVIEW_ROW_HEIGHT)
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.scroll_by(-1 if e.delta > 0 else 1))
+        widget.bind("<Button-4>", lambda e: self.scroll_by(-1))
+        widget.bind("<Button-5>", lambda e: self.scroll_by(1))
+
+    def make_row(self):
+        row = ttk.Frame(self.viewport, padding=10, style='TFrame')
+        row.question_label = ttk.Label(row, font=('Segoe UI', 12, 'bold'), wraplength=800)
+        row.question_label.pack(anchor='w')
+
+        user_frame = ttk.Frame(row)
+        user_frame.pack(fill='x', pady=2)
+        ttk.Label(user_frame, text="Your Answer:", font=('Segoe UI', 10)).pack(side='left')
+        row.user_label = ttk.Label(user_frame, font=('Segoe UI', 10, 'bold'))
+        row.user_label.pack(side='left', padx=5)
+
+        correct_frame = ttk.Frame(row)
+        correct_frame.pack(fill='x', pady=2)
+        ttk.Label(correct_frame, text="Correct Answer:", font=('Segoe UI', 10)).pack(side='left')
+        row.correct_label = ttk.Label(correct_frame, font=('Segoe UI', 10, 'bold'), foreground=SUCCESS_COLOR)
+        row.correct_label.pack(side='left', padx=5)
+
+        ttk.Separator(row).pack(fill='x', side='bottom')
+
+        for widget in (row, row.question_label, user_frame, correct_frame, row.user_label, row.correct_label):
+            self.bind_wheel(widget)
+        return row
+
+    def on_resize(self, event=None):
+        # Grow the row pool to cover the viewport; rows are never destroyed
+        while len(self.rows) < self.visible_count() + 1:
+            self.rows.append(self.make_row())
+        self.refresh()
+
+    def scroll_by(self, rows):
+        if rows > 0 and self.top + self.shown >= len(self.indices):
+            return
+        self.top = max(0, min(self.top + rows, len(self.indices) - 1))
+        self.refresh()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.indices))
+            self.scroll_by(0)
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.shown)
+        else:
+            self.scroll_by(int(amount))
+
+    def refresh(self):
+        total = len(self.indices)
+        filled = []
+        for slot, row in enumerate(self.rows):
+            position = self.top + slot
+            if position >= total:
+                row.place_forget()
+                continue
+            index = self.indices[position]
+            question_data = self.questions[index]
+            answer = self.answer_at(index)
+            correct_answer = question_data[5]
+            row.question_label.config(text=f"Q{index + 1}: {question_data[0]}")
+            row.user_label.config(text=answer,
+                                  foreground=SUCCESS_COLOR if self.is_correct(index) else ERROR_COLOR)
+            row.correct_label.config(text=correct_answer)
+            filled.append(row)
+
+        # Let the rows work out their requested heights, then stack them
+        self.viewport.update_idletasks()
+        viewport_height = self.viewport.winfo_height()
+        y = 0
+        self.shown = 0
+        for row in filled:
+            if y >= viewport_height:
+                row.place_forget()
+                continue
+            height = max(REVIEW_ROW_HEIGHT, row.winfo_reqheight())
+            row.place(x=0, y=y, relwidth=1, height=height)
+            y += height
+            if y <= viewport_height:
+                self.shown += 1
+        self.shown = max(1, self.shown)
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.shown) / total))
+        else:
+            self.scrollbar.set(0, 1)
 
-# Custom styles and colors
-BG_COLOR = "#f5f5f5"
-PRIMARY_COLOR = "#4a6fa5"
-SECONDARY_COLOR = "#166088"
-ACCENT_COLOR = "#4fc3f7"
-TEXT_COLOR = "#333333"
-ERROR_COLOR = "#d32f2f"
-SUCCESS_COLOR = "#388e3c"
 
 class QuizApp:
     def __init__(self, root):
@@ -42,33 +2989,64 @@ class QuizApp:
         
         self.username = ""
         self.timer_label = None
+        self.timer_handle = None
+        self.ticker = CountdownTicker(root)
         self.completed_quizzes = set()
         self.submit_button = True
-        self.selected_answers = []
-        self.questions = []
-        self.current_question_index = 0
+        self.user = None
+        self.selected_subject = tk.StringVar()
+        self.startup_times = {}
 
-        self.choose_subject()
+        self.settings = SettingsStore()
+        self.settings.subscribe("theme", lambda theme: self.apply_theme())
+        self.user_store = UserStore(iterations=self.settings.password_iterations())
+        self.login_verifier = LoginVerifier(self.user_store.iterations)
+        self.session_token = None
+        self.question_bank = QuestionBank()
+        self.result_store = ResultStore()
+        self.completion_index = CompletionIndex()
+        self.session = QuizSession(self.question_bank, self.result_store)
+        self.jobs = BackgroundJobs(root, iterations=self.user_store.iterations)
+        # The one-time student_info.csv import hashes every password, so it runs off the Tk thread
+        self.student_migration = None
+        if self.user_store.migration_pending():
+            self.student_migration = self.jobs.submit(
+                lambda stores, job: stores.user_store.migrate_from_csv(progress=job.progress),
+                self.students_migrated, self.student_migration_failed)
+        self.quiz_loading = False
+        self.subject_tree = None
+        if METRICS.enabled:
+            self.watch_mainloop()
+
+        # Other screens are built the first time they are opened
         self.create_login_screen()
         
+    def students_migrated(self, added):
+        self.student_migration = None
+
+    def student_migration_failed(self, error):
+        self.student_migration = None
+        messagebox.showerror("Error", f"Could not import student_info.csv: {error}")
+
+    def watch_mainloop(self, expected=None):
+        """Record how late a MAINLOOP_CHECK_MS timer fires, i.e. how long callbacks held the mainloop"""
+        now = time.perf_counter()
+        if expected is not None:
+            METRICS.record("mainloop_lag", max(0.0, now - expected), None)
+        self.root.after(MAINLOOP_CHECK_MS, self.watch_mainloop, now + MAINLOOP_CHECK_MS / 1000)
+
     def create_login_screen(self):
+        # Returning here signs the current user out
+        self.login_verifier.revoke(self.session_token)
+        self.session_token = None
         for widget in self.root.winfo_children():
             widget.destroy()
         
         self.login_frame = ttk.Frame(self.root, padding=20)
         self.login_frame.pack(expand=True, fill='both')
         
-        # Theme setting variable
-        self.theme_var = tk.StringVar(value="light")  # Default to light theme
-        
-        # Load saved theme preference if exists
-        try:
-            with open("theme_settings.txt", "r") as f:
-                saved_theme = f.read().strip()
-                if saved_theme in ["light", "dark"]:
-                    self.theme_var.set(saved_theme)
-        except FileNotFoundError:
-            pass
+        # Theme setting variable, from the cached settings
+        self.theme_var = tk.StringVar(value=self.settings.theme())
         
         # Apply the theme immediately
         self.apply_theme()
@@ -88,9 +3066,9 @@ class QuizApp:
         theme_frame.grid(row=3, column=0, columnspan=2, pady=10)
         ttk.Label(theme_frame, text="Theme:").pack(side='left')
         ttk.Radiobutton(theme_frame, text="Light", variable=self.theme_var, 
-                    value="light", command=self.apply_theme).pack(side='left', padx=5)
+                    value="light", command=self.save_theme).pack(side='left', padx=5)
         ttk.Radiobutton(theme_frame, text="Dark", variable=self.theme_var, 
-                    value="dark", command=self.apply_theme).pack(side='left', padx=5)
+                    value="dark", command=self.save_theme).pack(side='left', padx=5)
         
         self.login_btn = ttk.Button(self.login_frame, text="Login", command=self.login, style='TButton')
         self.login_btn.grid(row=4, column=0, columnspan=2, pady=20, ipady=5, sticky="ew")
@@ -99,13 +3077,13 @@ class QuizApp:
         self.login_frame.grid_columnconfigure(0, weight=1)
         self.login_frame.grid_columnconfigure(1, weight=2)
 
+    def save_theme(self):
+        """Store the chosen theme; the settings subscription applies it"""
+        self.settings.set_theme(self.theme_var.get())
+
     def apply_theme(self):
         """Apply the selected theme (light/dark)"""
-        theme = self.theme_var.get()
-        
-        # Save theme preference
-        with open("theme_settings.txt", "w") as f:
-            f.write(theme)
+        theme = self.settings.theme()
         
         # Define colors for each theme
         if theme == "dark":
@@ -137,32 +3115,62 @@ class QuizApp:
         for widget in self.root.winfo_children():
             widget.update()
 
+    @METRICS.timed("login")
     def login(self):
         self.username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
 
-        if self.username == "admin" and password == "admin":
-            self.create_admin_panel()
-            return
-
         if not self.username or not password:
             messagebox.showerror("Error", "Please enter both username and password.")
             return
+        if self.student_migration is not None:
+            messagebox.showinfo("Please Wait", "Student accounts are still being imported. Please try again in a moment.")
+            return
+
+        # Only the index probe runs here; the password hash runs on the login pool
+        row = self.user_store.lookup(self.username)
+        self.login_btn.config(state="disabled", text="Signing in...")
+        future = self.login_verifier.verify(row, self.username, password)
+        self.root.after(0, self.finish_login, future, time.perf_counter())
+
+    def finish_login(self, future, started):
+        """Poll the password check from the Tk thread and act on its result"""
+        if not future.done():
+            self.root.after(LOGIN_POLL_MS, self.finish_login, future, started)
+            return
+        if METRICS.enabled:
+            METRICS.record("login_verify", time.perf_counter() - started, None)
+        if self.login_btn.winfo_exists():
+            self.login_btn.config(state="normal", text="Login")
 
-        if not os.path.exists("student_info.csv"):
-            messagebox.showerror("Error", "Student database not found. Please upload student CSV.")
+        user, upgrade = future.result()
+        if user is None:
+            messagebox.showerror("Error", "Invalid Username or Password")
             return
+        if upgrade is not None:
+            self.user_store.set_password_hash(user["id"], *upgrade)
 
-        with open("student_info.csv", "r", newline="") as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if len(row) >= 2 and row[0] == self.username and row[1] == password:
-                    self.create_quiz_section()
-                    return
+        self.user = user
+        self.session_token = self.login_verifier.issue(user)
+        # One indexed range read; start_quiz then checks this set
+        self.completed_quizzes = self.completion_index.completed_subjects(user["id"])
+        if user["is_admin"]:
+            self.create_admin_panel()
+        else:
+            self.create_quiz_section()
 
-        messagebox.showerror("Error", "Invalid Username or Password")
+    def signed_in(self):
+        """True while the login session is live; otherwise back to the login screen"""
+        if self.login_verifier.user_for(self.session_token) is not None:
+            return True
+        self.user = None
+        messagebox.showinfo("Session Expired", "Please log in again.")
+        self.create_login_screen()
+        return False
 
     def create_admin_panel(self):
+        if not self.signed_in():
+            return
         for widget in self.root.winfo_children():
             widget.destroy()
         
@@ -186,6 +3194,7 @@ class QuizApp:
             ("Add Quizzes", self.manage_quizzes),
             ("Student Info", self.student_info),
             ("Set Quiz Timer", self.set_quiz_timer),  # New option added here
+            ("Performance Stats", self.show_metrics),
             ("Return", self.create_login_screen)
             
         ]
@@ -206,79 +3215,101 @@ class QuizApp:
         )
         self.watermark_label.place(relx=0.5, rely=0.5, anchor="center")
 
+    def show_metrics(self):
+        """Live latency percentiles of the instrumented paths, refreshed every second"""
+        for widget in self.admin_frame.winfo_children():
+            widget.destroy()
+
+        container = ttk.Frame(self.admin_frame, padding=20)
+        container.pack(expand=True, fill='both')
+
+        ttk.Label(container, text="Performance Stats", style='Header.TLabel').pack(pady=(0, 20))
+        if not METRICS.enabled:
+            ttk.Label(container, text="Instrumentation is off. Start the app with QUIZ_METRICS=1 "
+                                      "to record timings.").pack(pady=10)
+            return
+
+        columns = ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "read_bytes", "write_bytes")
+        tree = ttk.Treeview(container, columns=columns, height=10)
+        tree.heading("#0", text="Path")
+        tree.column("#0", width=140)
+        for column in columns:
+            tree.heading(column, text=column.replace("_", " "))
+            tree.column(column, width=80, anchor="e")
+        tree.pack(fill='both', expand=True)
+        ttk.Label(container, text=f"mainloop_lag above {MAINLOOP_BUDGET_MS} ms means a callback held up the "
+                                  f"window. Also written to {METRICS.path} every {METRICS_DUMP_SECONDS}s").pack(pady=10)
+
+        def refresh():
+            if not tree.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for name, summary in METRICS.snapshot().items():
+                tree.insert("", "end", text=name, values=[summary[column] for column in columns])
+            self.root.after(1000, refresh)
+
+        refresh()
+
     def set_quiz_timer(self):
-        """Create interface to set quiz timer in minutes"""
+        """Admin panel function to set quiz timer duration"""
         for widget in self.admin_frame.winfo_children():
             widget.destroy()
 
         container = ttk.Frame(self.admin_frame, padding=20)
         container.pack(expand=True)
 
-        ttk.Label(container, text="Set Quiz Timer Duration", style='Header.TLabel').pack(pady=(0, 20))
+        ttk.Label(container, text="Set Quiz Timer", style='Header.TLabel').pack(pady=(0, 20))
 
-        # Input frame
-        input_frame = ttk.Frame(container)
-        input_frame.pack(pady=20)
+        # Pre-fill with the current duration
+        minutes, seconds = divmod(self.settings.quiz_seconds(), 60)
 
-        ttk.Label(input_frame, text="Duration (minutes):").pack(side='left')
-        
-        # Entry for minutes with validation
-        vcmd = (self.root.register(self.validate_minutes), '%P')
-        self.timer_entry = ttk.Entry(input_frame, validate='key', validatecommand=vcmd, width=10)
-        self.timer_entry.pack(side='left', padx=10)
-        
-        # Load existing timer value if available
-        try:
-            with open("timer_settings.txt", "r") as f:
-                total_seconds = int(f.read())
-                minutes = total_seconds // 60
-                self.timer_entry.insert(0, str(minutes))
-        except (FileNotFoundError, ValueError):
-            self.timer_entry.insert(0, "5")  # Default value
+        # Minutes entry
+        ttk.Label(container, text="Minutes:").pack()
+        self.minutes_entry = ttk.Entry(container)
+        self.minutes_entry.pack(pady=5)
+        self.minutes_entry.insert(0, str(minutes))
+
+        # Seconds entry
+        ttk.Label(container, text="Seconds:").pack()
+        self.seconds_entry = ttk.Entry(container)
+        self.seconds_entry.pack(pady=5)
+        self.seconds_entry.insert(0, str(seconds))
+
+        # Random sample size per student
+        ttk.Label(container, text="Questions per exam (0 = all):").pack()
+        self.sample_entry = ttk.Entry(container)
+        self.sample_entry.pack(pady=5)
+        self.sample_entry.insert(0, str(self.settings.exam_sample_size()))
 
         # Button frame
         btn_frame = ttk.Frame(container)
         btn_frame.pack(pady=20)
 
-        ttk.Button(btn_frame, text="Save", command=self.save_quiz_timer, 
+        ttk.Button(btn_frame, text="Save Timer", command=self.save_quiz_timer, 
                 style='TButton').pack(side='left', padx=5)
-        ttk.Button(btn_frame, text="Cancel", command=self.create_admin_panel, 
+        ttk.Button(btn_frame, text="Back", command=self.manage_quizzes, 
                 style='Secondary.TButton').pack(side='right', padx=5)
 
-    def validate_minutes(self, new_value):
-        """Validate that the input is a positive integer"""
-        if new_value == "":
-            return True
-        try:
-            return int(new_value) > 0
-        except ValueError:
-            return False
-
     def save_quiz_timer(self):
-        """Save the timer settings to file"""
-        minutes_str = self.timer_entry.get()
-        if not minutes_str:
-            messagebox.showerror("Error", "Please enter a duration")
-            return
-        
+        """Save the timer duration to the settings table"""
         try:
-            minutes = int(minutes_str)
-            if minutes <= 0:
-                raise ValueError("Time must be positive")
-                
-            # Convert minutes to seconds
-            total_seconds = minutes * 60
+            minutes = int(self.minutes_entry.get())
+            seconds = int(self.seconds_entry.get())
+            sample_size = int(self.sample_entry.get() or 0)
             
-            with open("timer_settings.txt", "w") as f:
-                f.write(str(total_seconds))
+            if minutes < 0 or seconds < 0 or seconds >= 60 or minutes * 60 + seconds == 0 or sample_size < 0:
+                raise ValueError("Invalid time values")
                 
-            messagebox.showinfo("Success", f"Quiz timer set to {minutes} minutes")
-            self.create_admin_panel()
+            self.settings.set_quiz_seconds(minutes * 60 + seconds)
+            self.settings.set_exam_sample_size(sample_size)
+                
+            messagebox.showinfo("Success", "Timer settings saved successfully!")
+            self.manage_quizzes()
             
         except ValueError:
-            messagebox.showerror("Error", "Please enter a valid positive number")
-            self.timer_entry.focus()
-        
+            messagebox.showerror("Error", "Please enter a positive duration (0-59 for seconds) "
+                                          "and a question count of 0 or more")
+            
     def toggle_admin_sidebar(self):
         for btn in self.admin_buttons:
             if btn.winfo_ismapped():
@@ -308,33 +3339,141 @@ class QuizApp:
         
         ttk.Button(btn_frame, text="Upload Student CSV", command=self.upload_student_csv, 
                  style='TButton').pack(pady=10, fill='x')
-        ttk.Button(btn_frame, text="View Student CSV", command=self.view_student_csv, 
+        ttk.Button(btn_frame, text="View Students", command=self.view_students, 
                  style='TButton').pack(pady=10, fill='x')
         ttk.Button(btn_frame, text="Add Student Manually", command=self.add_student_manually, 
                  style='TButton').pack(pady=10, fill='x')
         ttk.Button(btn_frame, text="Back", command=self.create_admin_panel, 
                  style='Secondary.TButton').pack(pady=20, fill='x')
-        ttk.Button(btn_frame, text="Add Student CSV", command=self.upload_student_csv, 
+        ttk.Button(btn_frame, text="Add Student CSV", command=self.add_student_csv, 
                  style='TButton').pack(pady=10, fill='x')
         
-    def view_student_csv(self):
-        file_path = "student_info.csv"
-        if os.path.exists(file_path):
-            os.startfile(file_path)
-        else:
-            messagebox.showerror("Error", "No student CSV file found.")
+    def view_students(self):
+        """Searchable list of the student accounts in the users table"""
+        for widget in self.admin_frame.winfo_children():
+            widget.destroy()
+
+        container = ttk.Frame(self.admin_frame, padding=20)
+        container.pack(expand=True, fill='both')
+
+        ttk.Label(container, text="Students", style='Header.TLabel').pack(pady=(0, 10))
+        counts = ttk.Label(container, text="Counting students...")
+        counts.pack(pady=5)
+
+        def counted(result):
+            if counts.winfo_exists():
+                counts.config(text=f"{result[0]:,} active, {result[1]:,} deactivated")
+
+        # A full pass over the users table, so it runs off the Tk thread
+        self.jobs.submit(lambda stores, job: stores.user_store.count_students(), counted)
+
+        search_frame = ttk.Frame(container)
+        search_frame.pack(fill='x', pady=5)
+        ttk.Label(search_frame, text="Username starts with").pack(side='left', padx=5)
+        search = ttk.Entry(search_frame)
+        search.pack(side='left', fill='x', expand=True, padx=5)
+
+        list_frame = ttk.Frame(container)
+        list_frame.pack(fill='both', expand=True)
+        tree = ttk.Treeview(list_frame, columns=("status", "created"), height=15)
+        tree.heading("#0", text="Username")
+        tree.column("#0", width=240)
+        tree.heading("status", text="Status")
+        tree.column("status", width=100)
+        tree.heading("created", text="Added")
+        tree.column("created", width=160)
+        scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        note = ttk.Label(container, text="")
+        note.pack(pady=5)
+
+        limit = 500
+
+        def refresh(event=None):
+            tree.delete(*tree.get_children())
+            rows = self.user_store.list_students(search.get().strip(), limit)
+            for username, is_active, created_at in rows:
+                tree.insert("", "end", text=username,
+                            values=("Active" if is_active else "Deactivated", created_at or ""))
+            note.config(text=f"Showing the first {limit}; type more of a username to narrow the list"
+                        if len(rows) == limit else "")
+
+        search.bind("<KeyRelease>", refresh)
+        refresh()
+        ttk.Button(container, text="Back", command=self.student_info,
+                   style='Secondary.TButton').pack(pady=10)
     
     def upload_student_csv(self):
+        """Sync the accounts to a full term roster; students not in it are deactivated"""
+        file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
+        if not file_path or not messagebox.askyesno(
+                "Sync Roster", "Students missing from this roster will be deactivated and unable to log in.\n\n"
+                               "Continue?"):
+            return
+        self.run_with_progress(
+            "Syncing Roster",
+            lambda stores, job: stores.user_store.sync_roster(file_path, progress=job.progress),
+            lambda report: messagebox.showinfo("Success", "Student roster synced.\n\n" + report.summary()),
+            "Failed to sync roster")
+
+    def add_student_csv(self):
+        """Add the students in a CSV, leaving existing accounts alone"""
         file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
         if file_path:
-            try:
-                with open(file_path, "r") as file:
-                    reader = csv.reader(file)
-                    for row in reader:
-                        print(f"Username: {row[0]}, Password: {row[1]}")
-                messagebox.showinfo("Success", "Student data uploaded successfully.")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to upload file: {str(e)}")
+            self.run_with_progress(
+                "Importing Students",
+                lambda stores, job: stores.user_store.import_csv(file_path, progress=job.progress),
+                lambda report: messagebox.showinfo(
+                    "Success", "Student data uploaded successfully.\n\n" + report.summary()),
+                "Failed to upload file")
+
+    def run_with_progress(self, title, work, done, error_prefix="Error"):
+        """Run work(stores, job) in the background behind a progress window with a Cancel button.
+
+        The bar is indeterminate until the job reports progress. done(result)
+        runs on the Tk thread after the window closes; cancelling closes it
+        straight away and drops the result.
+        """
+        window = Toplevel(self.root)
+        window.title(title)
+        window.geometry("360x150")
+        window.resizable(False, False)
+
+        frame = ttk.Frame(window, padding=20)
+        frame.pack(expand=True, fill='both')
+        bar = ttk.Progressbar(frame, maximum=100, mode='indeterminate')
+        bar.pack(fill='x')
+        bar.start(JOB_POLL_MS)
+        status = ttk.Label(frame, text="Working...")
+        status.pack(pady=10)
+
+        def progress(fraction, rows):
+            if not rows:
+                return
+            if str(bar['mode']) != 'determinate':
+                bar.stop()
+                bar.config(mode='determinate')
+            bar['value'] = fraction * 100
+            status.config(text=f"{rows:,} rows read (~{fraction:.0%})")
+
+        def finished(result):
+            window.destroy()
+            done(result)
+
+        def failed(error):
+            window.destroy()
+            messagebox.showerror("Error", f"{error_prefix}: {error}")
+
+        def cancel():
+            job.cancel()
+            window.destroy()
+
+        ttk.Button(frame, text="Cancel", command=cancel, style='Secondary.TButton').pack()
+        window.protocol("WM_DELETE_WINDOW", cancel)
+        job = self.jobs.submit(work, finished, failed, progress)
+        return job
     
     def add_student_manually(self):
         top = Toplevel(self.root)
@@ -360,19 +3499,10 @@ class QuizApp:
             password = password_entry.get().strip()
             
             if username and password:
-                try:
-                    with open("student_info.csv", "r", newline="") as file:
-                        existing_data = list(csv.reader(file))
-                except FileNotFoundError:
-                    existing_data = []
-                
-                with open("student_info.csv", "a", newline="") as file:
-                    writer = csv.writer(file)
-                    if [username, password] not in existing_data:
-                        writer.writerow([username, password])
-                        messagebox.showinfo("Success", "Student added successfully.")
-                    else:
-                        messagebox.showerror("Error", "Username already exists.")
+                if self.user_store.add_user(username, password):
+                    messagebox.showinfo("Success", "Student added successfully.")
+                else:
+                    messagebox.showerror("Error", "Username already exists.")
                     
                 top.destroy()
             else:
@@ -392,6 +3522,15 @@ class QuizApp:
         container.pack(expand=True, fill='both')
         
         ttk.Label(container, text="Manage Quizzes", style='Header.TLabel').pack(pady=(0, 20))
+
+        columns = ("questions", "size", "updated")
+        tree = self.subject_tree = ttk.Treeview(container, columns=columns, height=6)
+        tree.heading("#0", text="Subject")
+        tree.column("#0", width=260)
+        for column, heading, width in zip(columns, ("Questions", "Bank Size", "Last Updated"), (90, 90, 160)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor="e" if column != "updated" else "w")
+        tree.pack(fill='x', pady=(0, 10))
         
         btn_frame = ttk.Frame(container)
         btn_frame.pack()
@@ -402,6 +3541,8 @@ class QuizApp:
                 style='TButton', width=20).pack(pady=10, fill='x')
         ttk.Button(btn_frame, text="Set Quiz Timer", command=self.set_quiz_timer,
                 style='TButton', width=20).pack(pady=10, fill='x')
+        ttk.Button(btn_frame, text="Remove Duplicates", command=self.remove_duplicates,
+                style='TButton', width=20).pack(pady=10, fill='x')
         ttk.Button(btn_frame, text="Refresh Quiz List", command=self.refresh_quiz_list, 
                 style='Secondary.TButton', width=20).pack(pady=10, fill='x')
         ttk.Button(btn_frame, text="Back", command=self.create_admin_panel, 
@@ -419,39 +3560,36 @@ class QuizApp:
         main_frame.pack(expand=True, fill='both')
         
         ttk.Label(main_frame, text="Choose Subject", style='Header.TLabel').pack(pady=(0, 20))
+        ttk.Label(main_frame, text="Pick a subject, or type a name to add a new one").pack(pady=5)
 
-        subjects = [
-            "Power Device and Circuit",
-            "Advance Java Programming",
-            "Project Management",
-            "Cellular Network"
-        ]
-
+        subjects = self.question_bank.catalog.names()
         selected_subject = tk.StringVar()
-        
-        for subject in subjects:
-            ttk.Radiobutton(main_frame, text=subject, variable=selected_subject, 
-                          value=subject).pack(anchor="w", padx=20, pady=5)
+        ttk.Combobox(main_frame, textvariable=selected_subject, values=subjects).pack(padx=20, pady=5, fill='x')
 
         def confirm_subject():
-            subject_name = selected_subject.get().strip()
+            subject_name = " ".join(selected_subject.get().split())
 
             if not subject_name:
                 messagebox.showerror("Error", "Please select a subject first!")
                 return
+            if subject_name not in subjects and not messagebox.askyesno(
+                    "New Subject", f"'{subject_name}' is not a subject yet. Add it?"):
+                return
             
             file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
             
+            subject_popup.destroy()
             if file_path:
-                filename = subject_name.replace(" ", "_") + ".csv"
-                try:
-                    shutil.copy(file_path, filename)
-                    messagebox.showinfo("Success", f"Quiz file uploaded for '{subject_name}' successfully!")
+                def uploaded(report):
+                    messagebox.showinfo("Success", f"Quiz file uploaded for '{subject_name}' successfully!\n\n"
+                                        + report.summary())
                     self.refresh_quiz_list()
-                except Exception as e:
-                    messagebox.showerror("Error", f"Failed to upload file: {str(e)}")
 
-            subject_popup.destroy()
+                def upload(stores, job):
+                    stores.question_bank.catalog.add(subject_name)
+                    return stores.question_bank.import_csv(subject_name, file_path, progress=job.progress)
+
+                self.run_with_progress("Importing Questions", upload, uploaded, "Failed to upload file")
         
         btn_frame = ttk.Frame(main_frame)
         btn_frame.pack(pady=20, fill='x')
@@ -459,14 +3597,65 @@ class QuizApp:
         ttk.Button(btn_frame, text="OK", command=confirm_subject, style='TButton').pack(side='left', padx=5, expand=True)
         ttk.Button(btn_frame, text="Cancel", command=subject_popup.destroy, style='Secondary.TButton').pack(side='right', padx=5, expand=True)
             
+    def remove_duplicates(self):
+        subject_popup = Toplevel(self.root)
+        subject_popup.title("Remove Duplicates")
+        subject_popup.geometry("400x300")
+        subject_popup.resizable(False, False)
+
+        main_frame = ttk.Frame(subject_popup, padding=20)
+        main_frame.pack(expand=True, fill='both')
+
+        ttk.Label(main_frame, text="Choose Subject", style='Header.TLabel').pack(pady=(0, 20))
+
+        selected_subject = tk.StringVar()
+        ttk.Combobox(main_frame, textvariable=selected_subject, values=self.question_bank.catalog.names(),
+                     state="readonly").pack(padx=20, pady=5, fill='x')
+
+        def scan_subject():
+            subject_name = selected_subject.get()
+            if not subject_name:
+                messagebox.showerror("Error", "Please select a subject first!")
+                return
+            subject_popup.destroy()
+
+            def scanned(pairs):
+                if not pairs:
+                    messagebox.showinfo("Remove Duplicates", f"No duplicate questions found in '{subject_name}'.")
+                    return
+                exact = sum(1 for _, _, similarity in pairs if similarity == 1.0)
+                if messagebox.askyesno("Remove Duplicates",
+                                       f"Found {exact} exact and {len(pairs) - exact} near-duplicate questions "
+                                       f"in '{subject_name}'.\n\nRemove them, keeping the earliest copy of each?"):
+                    def removed(_):
+                        messagebox.showinfo("Success", f"Removed {len(pairs)} duplicate questions.")
+                        self.refresh_quiz_list()
+
+                    self.jobs.submit(
+                        lambda stores, job: stores.question_bank.remove_questions(
+                            subject_name, [duplicate_id for duplicate_id, _, _ in pairs]),
+                        removed)
+
+            self.run_with_progress(
+                "Scanning for Duplicates",
+                lambda stores, job: stores.question_bank.find_duplicates(subject_name),
+                scanned, "Failed to scan questions")
+
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.pack(pady=20, fill='x')
+
+        ttk.Button(btn_frame, text="Scan", command=scan_subject, style='TButton').pack(side='left', padx=5, expand=True)
+        ttk.Button(btn_frame, text="Cancel", command=subject_popup.destroy, style='Secondary.TButton').pack(side='right', padx=5, expand=True)
+
     def refresh_quiz_list(self):
-        try:
-            with open("quiz_questions.csv", "r") as file:
-                reader = csv.reader(file)
-                self.quiz_questions = list(reader)
-            messagebox.showinfo("Success", "Quiz list refreshed successfully!")
-        except FileNotFoundError:
-            messagebox.showerror("Error", "No quiz file found. Please upload a quiz CSV.")
+        """Refill the Manage Quizzes subject table from the catalog, one small query"""
+        tree = self.subject_tree
+        if tree is None or not tree.winfo_exists():
+            return
+        tree.delete(*tree.get_children())
+        for name, question_count, bank_bytes, updated_at, _ in self.question_bank.catalog.entries():
+            tree.insert("", "end", text=name,
+                        values=(f"{question_count:,}", f"{bank_bytes / 1024:,.0f} KB", updated_at or ""))
   
     def generate_question(self):
         for widget in self.admin_frame.winfo_children():
@@ -477,6 +3666,11 @@ class QuizApp:
         
         ttk.Label(container, text="Enter Question Details", style='Header.TLabel').pack(pady=(0, 20))
 
+        ttk.Label(container, text="Subject").pack(pady=2)
+        self.question_subject = tk.StringVar()
+        ttk.Combobox(container, textvariable=self.question_subject, values=self.question_bank.catalog.names(),
+                     state="readonly", width=57).pack(pady=5)
+
         fields = ["Question", "Option A", "Option B", "Option C", "Option D", "Correct Option (A/B/C/D)"]
         self.entries = {}
 
@@ -504,72 +3698,36 @@ class QuizApp:
             self.entries["Correct Option (A/B/C/D)"].get().strip().upper()
         ]
 
+        subject = self.question_subject.get()
+        if not subject:
+            messagebox.showerror("Error", "Please select a subject.")
+            return
         if "" in data or data[-1] not in ["A", "B", "C", "D"]:
             messagebox.showerror("Error", "Please fill all fields correctly.")
             return
 
-        try:
-            file_name = "quiz_questions.csv"
-            with open(file_name, "a", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow(data)
+        def saved(_):
             messagebox.showinfo("Success", "Question saved successfully.")
             self.manage_quizzes()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save question: {str(e)}")
-            
-    def set_quiz_timer(self):
-        """Admin panel function to set quiz timer duration"""
-        for widget in self.admin_frame.winfo_children():
-            widget.destroy()
-
-        container = ttk.Frame(self.admin_frame, padding=20)
-        container.pack(expand=True)
-
-        ttk.Label(container, text="Set Quiz Timer", style='Header.TLabel').pack(pady=(0, 20))
-
-        # Minutes entry
-        ttk.Label(container, text="Minutes:").pack()
-        self.minutes_entry = ttk.Entry(container)
-        self.minutes_entry.pack(pady=5)
-        self.minutes_entry.insert(0, "5")  # Default value
-
-        # Seconds entry
-        ttk.Label(container, text="Seconds:").pack()
-        self.seconds_entry = ttk.Entry(container)
-        self.seconds_entry.pack(pady=5)
-        self.seconds_entry.insert(0, "0")  # Default value
-
-        # Button frame
-        btn_frame = ttk.Frame(container)
-        btn_frame.pack(pady=20)
 
-        ttk.Button(btn_frame, text="Save Timer", command=self.save_timer_settings, 
-                style='TButton').pack(side='left', padx=5)
-        ttk.Button(btn_frame, text="Back", command=self.manage_quizzes, 
-                style='Secondary.TButton').pack(side='right', padx=5)
+        def checked(duplicate):
+            if duplicate is not None:
+                _, text, similarity = duplicate
+                if similarity == 1.0:
+                    messagebox.showerror("Error", f"This question is already in '{subject}':\n\n{text}")
+                    return
+                if not messagebox.askyesno("Possible Duplicate",
+                                           f"This question is {similarity:.0%} similar to:\n\n{text}\n\nSave it anyway?"):
+                    return
+            self.jobs.submit(lambda stores, job: stores.question_bank.add_question(subject, data), saved,
+                             lambda e: messagebox.showerror("Error", f"Failed to save question: {str(e)}"))
 
-    def save_timer_settings(self):
-        """Save the timer settings to a file"""
-        try:
-            minutes = int(self.minutes_entry.get())
-            seconds = int(self.seconds_entry.get())
-            
-            if minutes < 0 or seconds < 0 or seconds >= 60:
-                raise ValueError("Invalid time values")
-                
-            total_seconds = minutes * 60 + seconds
-            
-            with open("timer_settings.txt", "w") as f:
-                f.write(str(total_seconds))
-                
-            messagebox.showinfo("Success", "Timer settings saved successfully!")
-            self.manage_quizzes()
-            
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid numbers (0-59 for seconds)")
+        # The subject's fingerprint index makes this a couple of indexed lookups
+        self.jobs.submit(lambda stores, job: stores.question_bank.find_duplicate(subject, data[0]), checked)
             
     def create_quiz_section(self):
+        if not self.signed_in():
+            return
         for widget in self.root.winfo_children():
             widget.destroy()
         
@@ -631,22 +3789,30 @@ class QuizApp:
         
         ttk.Label(self.subject_frame, text="Select a Subject", style='Header.TLabel').pack(pady=(0, 30))
         
-        subjects = [
-            "Power Device and Circuit",
-            "Advance Java Programming",
-            "Project Management",
-            "Cellular Network"
-        ]
-        
         self.selected_subject = tk.StringVar()
         
-        # Create a frame for radio buttons
-        radio_frame = ttk.Frame(self.subject_frame)
-        radio_frame.pack()
-        
-        for subject in subjects:
-            ttk.Radiobutton(radio_frame, text=subject, variable=self.selected_subject, 
-                          value=subject).pack(anchor="w", pady=5, padx=20)
+        # One query over the catalog; counts are kept current as questions change
+        list_frame = ttk.Frame(self.subject_frame)
+        list_frame.pack(fill='both', expand=True)
+        tree = ttk.Treeview(list_frame, columns=("questions", "updated"), height=12, selectmode='browse')
+        tree.heading("#0", text="Subject")
+        tree.column("#0", width=320)
+        tree.heading("questions", text="Questions")
+        tree.column("questions", width=90, anchor="e")
+        tree.heading("updated", text="Last Updated")
+        tree.column("updated", width=160)
+        scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        for name, question_count, _, updated_at, legacy_file in self.question_bank.catalog.entries():
+            if question_count:
+                tree.insert("", "end", iid=name, text=name, values=(f"{question_count:,}", updated_at or ""))
+            elif legacy_file and os.path.exists(legacy_file):
+                # Imported from its legacy file when the first quiz starts
+                tree.insert("", "end", iid=name, text=name, values=("-", ""))
+        tree.bind("<<TreeviewSelect>>", lambda event: self.selected_subject.set(tree.focus()))
         
         # Button frame
         btn_frame = ttk.Frame(self.subject_frame)
@@ -682,9 +3848,8 @@ class QuizApp:
                  style='Secondary.TButton', width=15).pack(pady=10, fill='x')
         
     def show_score_and_review_option(self):
-        correct_answers = [q[5] for q in self.questions]
-        score = sum(1 for i, answer in enumerate(self.selected_answers) if answer == correct_answers[i])
-        total_questions = len(self.questions)
+        score = self.session.score_result.score
+        total_questions = self.session.score_result.total
 
         message = f"Your score: {score} / {total_questions}\n\n"
         if score == total_questions:
@@ -707,57 +3872,21 @@ class QuizApp:
         container = ttk.Frame(self.root, padding=20)
         container.pack(expand=True, fill='both')
         
-        # Create a canvas and scrollbar for the review content
-        canvas = tk.Canvas(container, bg=BG_COLOR, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(container, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(
-                scrollregion=canvas.bbox("all")
-        ))
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Display each question with answers
-        for i, question_data in enumerate(self.questions):
-            question_text = question_data[0]
-            correct_answer = question_data[5]
-            selected_answer = self.selected_answers[i]
-            
-            # Question frame
-            q_frame = ttk.Frame(scrollable_frame, padding=10, style='TFrame')
-            q_frame.pack(fill='x', pady=5, padx=5)
-            
-            # Question label
-            ttk.Label(q_frame, text=f"Q{i + 1}: {question_text}", 
-                     font=('Segoe UI', 12, 'bold')).pack(anchor='w')
-            
-            # User's answer
-            user_frame = ttk.Frame(q_frame)
-            user_frame.pack(fill='x', pady=2)
-            ttk.Label(user_frame, text="Your Answer:", font=('Segoe UI', 10)).pack(side='left')
-            ttk.Label(user_frame, text=selected_answer, font=('Segoe UI', 10, 'bold'),
-                    foreground=ERROR_COLOR if selected_answer != correct_answer else SUCCESS_COLOR).pack(side='left', padx=5)
-            
-            # Correct answer
-            correct_frame = ttk.Frame(q_frame)
-            correct_frame.pack(fill='x', pady=2)
-            ttk.Label(correct_frame, text="Correct Answer:", font=('Segoe UI', 10)).pack(side='left')
-            ttk.Label(correct_frame, text=correct_answer, font=('Segoe UI', 10, 'bold'),
-                    foreground=SUCCESS_COLOR).pack(side='left', padx=5)
-            
-            # Separator
-            ttk.Separator(q_frame).pack(fill='x', pady=5)
+        # Filter toolbar
+        toolbar = ttk.Frame(container)
+        toolbar.pack(fill='x', pady=(0, 10))
+        only_wrong = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toolbar, text="Show only wrong answers", variable=only_wrong,
+                        command=lambda: review_list.show_only_wrong(only_wrong.get())).pack(side='left')
         
         # Back button
         ttk.Button(container, text="Back", command=self.choose_subject, 
-                 style='Secondary.TButton').pack(pady=20)
+                 style='Secondary.TButton').pack(side='bottom', pady=20)
+        
+        # Only the rows in view are built; scrolling recycles them
+        session = self.session
+        review_list = ReviewList(container, session.questions, session.selected_answers, session.score_result)
+        review_list.frame.pack(fill='both', expand=True)
         
     def start_quiz(self):
         subject = self.selected_subject.get()
@@ -769,25 +3898,44 @@ class QuizApp:
             messagebox.showinfo("Quiz Already Taken", "You have already completed this quiz.")
             return
 
-        # Load timer settings
+        if not self.quiz_loading:
+            self.load_questions(subject, self.begin_quiz)
+
+    def load_questions(self, subject, done):
+        """Prepare a subject's questions in the background, then call done(subject)"""
+        def loaded(found):
+            self.quiz_loading = False
+            if found:
+                done(subject)
+            else:
+                messagebox.showerror("Error", f"Quiz file for {subject} not found.")
+
+        def failed(error):
+            self.quiz_loading = False
+            messagebox.showerror("Error", str(error))
+
+        if not self.question_bank.catalog.exists(subject):
+            messagebox.showerror("Error", "Invalid subject selected.")
+            return
+        self.quiz_loading = True
+        self.jobs.submit(lambda stores, job: stores.question_bank.prepare(subject), loaded, failed)
+
+    def begin_quiz(self, subject):
+        # The pack and sample index are ready, so starting the session only maps and probes them
+        session = QuizSession(self.question_bank, self.result_store, self.user)
         try:
-            with open("timer_settings.txt", "r") as f:
-                self.countdown_seconds = int(f.read())
-        except (FileNotFoundError, ValueError):
-            # Default to 5 minutes if no settings exist
-            self.countdown_seconds = 300  # 5 minutes in seconds
+            session.start(subject, self.settings.quiz_seconds(), self.settings.exam_sample_size(),
+                          f"{self.user['id'] if self.user else 0}:{subject}")
+        except QuizError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.session = session
 
         for widget in self.root.winfo_children():
             widget.destroy()
-
-        self.load_questions(subject)
-        if not self.questions:
-            messagebox.showerror("Error", "No questions available for this subject.")
-            return
         
         self.completed_quizzes.add(subject) 
-        self.current_question_index = 0
-        self.selected_answers = []
+        self.render_times = []
         
         # Main quiz container
         self.quiz_container = ttk.Frame(self.root)
@@ -801,79 +3949,44 @@ class QuizApp:
         self.timer_label = ttk.Label(timer_frame, text="", font=('Segoe UI', 12, 'bold'))
         self.timer_label.pack(side='left', padx=5)
         
-        # Start the timer
-        self.update_timer()
+        # Start the timer, replacing any countdown left from an earlier quiz
+        if self.timer_handle is not None:
+            self.ticker.cancel(self.timer_handle)
+        self.timer_handle = self.ticker.add(session.deadline, self.update_timer, self.time_up)
         
         # Question area
         self.quiz_frame = ttk.Frame(self.quiz_container, padding=20)
         self.quiz_frame.pack(fill='both', expand=True)
+        self.build_question_view()
         
-        # Display first question
-        self.display_question()
-        
-        # Submit button at bottom
+        # Submit button at bottom, created before the first question so a
+        # one-question quiz can enable it
         self.submit_button = ttk.Button(self.quiz_container, text="Submit Quiz", 
                                     command=self.submit_quiz, 
                                     state="disabled",
                                     style='Accent.TButton')
         self.submit_button.pack(side='bottom', fill='x', pady=10, padx=20, ipady=10)
-
-    def load_questions(self, subject):
-        subject_files = {
-            "Power Device and Circuit": "power_device_and_circuit_questions.csv",
-            "Advance Java Programming": "advance_java_programming_questions.csv",
-            "Project Management": "project_management_questions.csv",
-            "Cellular Network": "cellular_network_questions.csv"
-        }
-        
-        file_name = subject_files.get(subject)
         
-        if not file_name:
-            messagebox.showerror("Error", "Invalid subject selected.")
-            return False
-        
-        try:
-            with open(file_name, "r") as file:
-                reader = csv.reader(file)
-                self.questions = [row for row in reader if row]
-        except FileNotFoundError:
-            messagebox.showerror("Error", f"Quiz file for {subject} not found.")
-            return False
-        
-        if not self.questions:
-            messagebox.showwarning("Warning", "No questions found in the quiz file.")
-            return False
-        
-        return True
-            
-    def display_question(self):
-        if self.current_question_index >= len(self.questions):
-            messagebox.showinfo("Quiz Completed", "You have completed the quiz!")
-            self.submit_quiz()
-            return
-
-        question_data = self.questions[self.current_question_index]
-        question_text = question_data[0]
-
-        # Clear previous question widgets
-        for widget in self.quiz_frame.winfo_children():
-            widget.destroy()
+        # Display first question
+        self.display_question()
 
-        # Display the question
-        ttk.Label(self.quiz_frame, text=question_text, 
-                 font=('Segoe UI', 14, 'bold'), wraplength=700).pack(pady=20)
+    def build_question_view(self):
+        """Create the question widgets once per quiz; display_question only updates them"""
+        self.question_label = ttk.Label(self.quiz_frame, text="", 
+                                        font=('Segoe UI', 14, 'bold'), wraplength=700)
+        self.question_label.pack(pady=20)
 
         # Options frame
         options_frame = ttk.Frame(self.quiz_frame)
         options_frame.pack(fill='x', padx=20)
         
-        # Define the options and initialize the selected_option
         self.selected_option = tk.StringVar()
-        
-        options = [question_data[1], question_data[2], question_data[3], question_data[4]]
-        for i, option in enumerate(options):
-            ttk.Radiobutton(options_frame, text=option, variable=self.selected_option, 
-                          value=chr(65 + i)).pack(anchor='w', pady=5, padx=20)
+        self.option_buttons = []
+        for i in range(4):
+            button = ttk.Radiobutton(options_frame, text="", variable=self.selected_option, 
+                                     value=chr(65 + i))
+            button.pack(anchor='w', pady=5, padx=20)
+            self.option_buttons.append(button)
 
         # Navigation buttons
         nav_frame = ttk.Frame(self.quiz_frame)
@@ -882,64 +3995,101 @@ class QuizApp:
         self.next_button = ttk.Button(nav_frame, text="Next", command=self.next_question, 
                                     style='TButton')
         self.next_button.pack(ipady=5, padx=10)
+
+    def record_render_time(self, started):
+        self.render_times.append((time.perf_counter() - started) * 1000)
+
+    def render_latency_stats(self):
+        """Summary in milliseconds of how long each question took to show"""
+        times = self.render_times
+        return {
+            "questions": len(times),
+            "mean_ms": sum(times) / len(times) if times else 0.0,
+            "p50_ms": percentile(times, 50),
+            "p95_ms": percentile(times, 95),
+            "max_ms": max(times, default=0.0),
+        }
+
+    @METRICS.timed("display_question")
+    def display_question(self):
+        session = self.session
+        if session.finished:
+            messagebox.showinfo("Quiz Completed", "You have completed the quiz!")
+            self.submit_quiz()
+            return
+
+        started = time.perf_counter()
+        question_data = session.current_question()
+        question_text = question_data[0]
+
+        # Touch the next question too so its page is loaded before Next is pressed
+        if not session.on_last_question:
+            session.questions[session.current_question_index + 1]
+
+        # Refill the persistent question view in place
+        self.question_label.config(text=question_text)
+        for button, option in zip(self.option_buttons, question_data[1:5]):
+            button.config(text=option)
+        self.selected_option.set("")
+
+        # Idle callbacks run after pending redraws, so this captures the paint too
+        self.root.after_idle(self.record_render_time, started)
         
         # Enable submit button if this is the last question
-        if self.current_question_index == len(self.questions) - 1:
+        if session.on_last_question:
             self.submit_button.config(state="normal")
         
-    def update_timer(self):
-        mins, secs = divmod(self.countdown_seconds, 60)
+    def update_timer(self, seconds_left):
+        mins, secs = divmod(seconds_left, 60)
         time_format = f'{mins:02d}:{secs:02d}'
-        self.timer_label.config(text=time_format)
+        if self.timer_label is not None and self.timer_label.winfo_exists():
+            self.timer_label.config(text=time_format)
 
-        if self.countdown_seconds > 0:
-            self.countdown_seconds -= 1
-            self.root.after(1000, self.update_timer)
-        else:
-            messagebox.showinfo("Time's Up!", "The time for the quiz has expired!")
-            self.submit_quiz()
+    def time_up(self):
+        self.timer_handle = None
+        messagebox.showinfo("Time's Up!", "The time for the quiz has expired!")
+        self.submit_quiz()
         
+    @METRICS.timed("submit_quiz")
     def submit_quiz(self):
-        if hasattr(self, 'timer_label'):
-         self.root.after_cancel(self.update_timer)
+        if self.timer_handle is not None:
+            self.ticker.cancel(self.timer_handle)
+            self.timer_handle = None
         
         if self.submit_button['state'] == 'normal':
             self.submit_button.config(state="disabled")
+        # Answers can no longer change once the quiz is submitted
+        self.next_button.config(state="disabled")
+        for button in self.option_buttons:
+            button.config(state="disabled")
 
+        # Storing the result also records the completion for this student
         self.calculate_score()
-        with open("completed_quizzes.txt", "a") as file:
-            file.write(f"{self.selected_subject.get()}\n")
-            
         self.show_score_and_review_option()
         
-    def load_completed_quizzes(self):
-        if os.path.exists("completed_quizzes.txt"):
-            with open("completed_quizzes.txt", "r") as file:
-                quizzes = file.readlines()
-                self.completed_quizzes = {quiz.strip() for quiz in quizzes}
-        
     def calculate_score(self):
-        if len(self.selected_answers) != len(self.questions):
+        if len(self.session.selected_answers) != len(self.session.questions):
             messagebox.showwarning("Warning", "Not all questions were answered!")
         
-        correct_answers = [q[5] for q in self.questions]
-        self.score = 0
-        
-        for i in range(min(len(self.selected_answers), len(self.questions))):
-            if self.selected_answers[i] == correct_answers[i]:
-                self.score += 1
-        
-        self.total_questions = len(self.questions)
+        # Grades once and stores the result; the review screen reuses it
+        result = self.session.submit()
+        self.score = result.score
+        self.total_questions = result.total
 
+    @METRICS.timed("next_question")
     def next_question(self):
         if not self.selected_option.get():
             messagebox.showwarning("No Option", "Please select an answer.")
             return
         
-        self.selected_answers.append(self.selected_option.get())
-        self.current_question_index += 1
-        
-        if self.current_question_index < len(self.questions):
+        try:
+            more = self.session.next_question(self.selected_option.get())
+        except QuizError as e:
+            messagebox.showerror("Error", str(e))
+            if self.session.expired and self.session.score_result is None:
+                self.submit_quiz()
+            return
+        if more:
             self.display_question()
         else:
             self.submit_quiz()
@@ -947,17 +4097,31 @@ class QuizApp:
     def finish_quiz(self):
         messagebox.showinfo("Quiz Finished", "Your quiz is finished!")
           
+    @METRICS.timed("show_performance")
     def show_performance(self):
+        # Deferred so that startup does not pay for matplotlib
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         for widget in self.root.winfo_children():
             widget.destroy()
                 
-        subjects = ["PD", "JAVA", "PM", "CN"]
-        scores = [75, 85, 90, 70]
+        # One stats row per subject, maintained as results are inserted
+        stats = self.result_store.user_stats(self.user["id"]) if self.user else []
+        if not stats:
+            ttk.Label(self.root, text="No quiz results yet", style='Header.TLabel').pack(pady=40)
+            ttk.Button(self.root, text="Back", command=self.create_quiz_section, 
+                     style='Secondary.TButton').pack(pady=20)
+            return
+        
+        # Short labels from the subject initials, e.g. "Project Management" -> "PM"
+        subjects = ["".join(word[0] for word in row[0].split()).upper() for row in stats]
+        scores = [round(row[2], 1) for row in stats]
                 
         fig, ax = plt.subplots(figsize=(8, 6))
         bars = ax.bar(subjects, scores, color=[PRIMARY_COLOR, SECONDARY_COLOR, ACCENT_COLOR, '#9c27b0'])
         ax.set_xlabel("Subjects")
-        ax.set_ylabel("Scores")
+        ax.set_ylabel("Average Score (%)")
         ax.set_title("Subject Wise Performance")
         ax.set_xticklabels(subjects, rotation=45, ha="right")
         
@@ -980,7 +4144,94 @@ class QuizApp:
         ttk.Button(self.root, text="Back", command=self.create_quiz_section, 
                  style='Secondary.TButton').pack(pady=20)
 
-if __name__ == "__main__":
+IMPORT_FINISHED = time.perf_counter()
+
+
+def report_startup(root, app, quit_after=False):
+    """Print import, init and first-paint times as one JSON line on stderr"""
+    init_finished = time.perf_counter()
+
+    def first_paint():
+        painted = time.perf_counter()
+        report = {
+            "import_ms": round((IMPORT_FINISHED - IMPORT_STARTED) * 1000, 1),
+            "init_ms": round((init_finished - IMPORT_FINISHED) * 1000, 1),
+            "first_paint_ms": round((painted - IMPORT_STARTED) * 1000, 1),
+            "matplotlib_loaded": "matplotlib" in sys.modules,
+            "numpy_loaded": "numpy" in sys.modules,
+        }
+        app.startup_times = report
+        print(json.dumps(report), file=sys.stderr)
+        if quit_after:
+            root.destroy()
+
+    # Idle callbacks run after the pending redraw of the login screen
+    root.after_idle(first_paint)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz Master Pro")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print startup timings as JSON and exit after the first paint")
+    parser.add_argument("--server", action="store_true",
+                        help="serve quizzes to many students over HTTP instead of opening a window")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--dedupe", metavar="SUBJECT",
+                        help="remove exact and near-duplicate questions from a subject's bank and exit")
+    parser.add_argument("--build-pack", metavar="SUBJECT",
+                        help=f"compile a subject's questions into {PACK_DIR}/ for fast loading and exit")
+    parser.add_argument("--csv-to-pack", nargs=2, metavar=("CSV", "PACK"),
+                        help="compile a question CSV into a pack file and exit")
+    parser.add_argument("--sync-roster", metavar="CSV",
+                        help="sync student accounts to a full username,password roster and exit")
+    parser.add_argument("--password-iterations", type=int, metavar="N",
+                        help="set the PBKDF2 cost for new passwords; existing ones upgrade at login")
+    parser.add_argument("--pack-to-csv", nargs=2, metavar=("PACK", "CSV"),
+                        help="check a pack's checksum, write its questions out as CSV and exit")
+    args = parser.parse_args()
+
+    if args.build_pack:
+        count = QuestionBank().build_pack(args.build_pack)
+        print(f"Packed {count} questions for '{args.build_pack}'.")
+        return
+    if args.csv_to_pack:
+        print(csv_to_pack(*args.csv_to_pack).summary())
+        return
+    if args.pack_to_csv:
+        print(f"Wrote {pack_to_csv(*args.pack_to_csv)} questions to {args.pack_to_csv[1]}.")
+        return
+
+    if args.sync_roster:
+        report = UserStore(iterations=SettingsStore().password_iterations()).sync_roster(args.sync_roster)
+        print(report.summary())
+        return
+
+    if args.password_iterations:
+        SettingsStore().set_password_iterations(args.password_iterations)
+        print(f"Password hashes now use {args.password_iterations} PBKDF2 iterations.")
+        return
+
+    if args.dedupe:
+        bank = QuestionBank()
+        started = time.perf_counter()
+        pairs = bank.find_duplicates(args.dedupe)
+        bank.remove_questions(args.dedupe, [duplicate_id for duplicate_id, _, _ in pairs])
+        exact = sum(1 for _, _, similarity in pairs if similarity == 1.0)
+        print(f"Removed {exact} exact and {len(pairs) - exact} near-duplicates from '{args.dedupe}' "
+              f"in {time.perf_counter() - started:.1f}s; {bank.count(args.dedupe)} questions left.")
+        return
+
+    if args.server:
+        QuizServer(host=args.host, port=args.port).serve_forever()
+        return
+
     root = tk.Tk()
     app = QuizApp(root)
-    root.mainloop()
\ No newline at end of file
+    if args.startup_report or os.environ.get("QUIZ_STARTUP_REPORT"):
+        report_startup(root, app, quit_after=args.startup_report)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file